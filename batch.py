@@ -0,0 +1,242 @@
+"""Batch video morphing over a manifest of jobs.
+
+The manifest is a JSON-lines or CSV file with one job per line/row and the
+fields `source` (face image), `video`, `output` and optionally `alpha`,
+`id` (default "job-<line>") and `landmark_mode` ("static" or "tracking").
+Jobs are spread over a pool of long-lived worker processes that keep their
+MediaPipe graph, FaceMorpher and loaded source profiles warm between jobs. Every finished
+job is appended to a state file next to the manifest, so re-running the
+same command resumes where it stopped.
+
+    python batch.py jobs.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+logger = logging.getLogger('batch')
+
+
+def _field(row, key, default):
+    """row[key], or default when the key is absent, null or an empty CSV cell; 0 is a real value."""
+    value = row.get(key)
+    return default if value is None or value == "" else value
+
+
+def load_manifest(path):
+    """Read jobs from a .jsonl/.json-lines or .csv manifest and give each one an id."""
+    jobs = []
+    with open(path, newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for index, row in enumerate(rows):
+        missing = [k for k in ("source", "video", "output") if not row.get(k)]
+        if missing:
+            raise ValueError(f"manifest line {index + 1}: missing {', '.join(missing)}")
+        jobs.append({
+            # the "job-" prefix keeps default ids from colliding with explicit numeric ones
+            "id": str(_field(row, "id", f"job-{index + 1}")),
+            "source": row["source"],
+            "video": row["video"],
+            "output": row["output"],
+            "alpha": float(_field(row, "alpha", 0.5)),
+            "landmark_mode": _field(row, "landmark_mode", "static"),
+        })
+
+    first_line = {}
+    for index, job in enumerate(jobs):
+        if job["id"] in first_line:
+            raise ValueError(f"manifest line {index + 1}: job id {job['id']!r} "
+                             f"already used on line {first_line[job['id']]}")
+        first_line[job["id"]] = index + 1
+    return jobs
+
+
+def load_state(state_path):
+    """Return {job_id: last recorded result} from a state file (missing file -> empty)."""
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    state[entry["id"]] = entry
+    return state
+
+
+def _part_path(output):
+    root, ext = os.path.splitext(output)
+    return f"{root}.part{ext or '.mp4'}"
+
+
+# ----------------- Worker process -----------------
+_worker = {}
+
+
+def _init_worker(progress_queue):
+    # imported here so the parent process never loads MediaPipe
+    from morph.utils import FaceUtils
+    from morph.morph_core import FaceMorpher
+
+    _worker["faceutils"] = FaceUtils()
+    _worker["morph_engine"] = FaceMorpher()
+    _worker["profiles"] = {}
+    _worker["progress"] = progress_queue
+
+
+def _run_job(job):
+    import trial
+
+    start = time.perf_counter()
+    progress = _worker["progress"]
+    try:
+        profiles = _worker["profiles"]
+        source = os.path.abspath(job["source"])
+        if source not in profiles:
+            profiles[source] = trial.load_source_profile(source, _worker["faceutils"])
+
+        def report(done, total):
+            progress.put((job["id"], done, total))
+
+        faceutils = _worker["faceutils"]
+        if job["landmark_mode"] == "tracking":
+            # a second, video-mode FaceMesh kept warm for tracking jobs
+            if "tracking_faceutils" not in _worker:
+                from morph.utils import FaceUtils
+                _worker["tracking_faceutils"] = FaceUtils(static_image_mode=False)
+            faceutils = _worker["tracking_faceutils"]
+
+        # write to a temporary name so an interrupted job never looks finished
+        part = _part_path(job["output"])
+        os.makedirs(os.path.dirname(os.path.abspath(job["output"])), exist_ok=True)
+        summary = trial.morph_video(
+            source, job["video"], part, job["alpha"],
+            faceutils=faceutils, morph_engine=_worker["morph_engine"],
+            source_profile=profiles[source], preview=False, progress_callback=report,
+            landmark_mode=job["landmark_mode"],
+        )
+        if summary["frames"] == 0:
+            raise RuntimeError("no frames were read from the input video")
+        os.replace(part, job["output"])
+        return {"id": job["id"], "status": "done", "output": job["output"], "frames": summary["frames"],
+                "elapsed": time.perf_counter() - start}
+    except Exception as e:
+        return {"id": job["id"], "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(), "elapsed": time.perf_counter() - start}
+
+
+# ----------------- Scheduler -----------------
+def _report_progress(progress_queue, stop):
+    last = {}
+    while not stop.is_set() or not progress_queue.empty():
+        try:
+            job_id, done, total = progress_queue.get(timeout=0.5)
+        except Exception:
+            continue
+        # log at most every 5s per job
+        now = time.monotonic()
+        if now - last.get(job_id, 0) >= 5.0:
+            last[job_id] = now
+            pct = f"{100.0 * done / total:.1f}%" if total > 0 else f"{done} frames"
+            logger.info(f"job {job_id}: {pct}")
+
+
+def run_batch(manifest_path, workers=2, state_path=None, retries=1, retry_failed=True):
+    """Run all unfinished jobs of a manifest; returns {job_id: result}.
+
+    Jobs already recorded as done (with their output present) are skipped.
+    A job that raises is recorded as failed without affecting the others;
+    if a worker process dies, the jobs it may have been running are retried
+    up to `retries` times in a fresh pool.
+    """
+    jobs = load_manifest(manifest_path)
+    state_path = state_path or manifest_path + ".state.jsonl"
+    state = load_state(state_path)
+
+    pending = []
+    for job in jobs:
+        prev = state.get(job["id"])
+        if prev and prev["status"] == "done" and os.path.exists(job["output"]):
+            continue
+        if prev and prev["status"] == "failed" and not retry_failed:
+            continue
+        pending.append(dict(job, attempts=0))
+    logger.info(f"run_batch: {len(jobs)} jobs in manifest, {len(pending)} to run, {workers} workers")
+
+    ctx = multiprocessing.get_context("spawn")
+    manager = ctx.Manager()
+    progress_queue = manager.Queue()
+    stop = threading.Event()
+    reporter = threading.Thread(target=_report_progress, args=(progress_queue, stop), daemon=True)
+    reporter.start()
+
+    results = {}
+
+    def record(result):
+        results[result["id"]] = result
+        with open(state_path, "a") as f:
+            f.write(json.dumps({k: v for k, v in result.items() if k != "traceback"}) + "\n")
+        if result["status"] == "done":
+            logger.info(f"job {result['id']}: done in {result['elapsed']:.1f}s -> {result['output']}")
+        else:
+            logger.error(f"job {result['id']}: failed: {result['error']}")
+
+    try:
+        while pending:
+            batch, pending = pending, []
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                     initializer=_init_worker, initargs=(progress_queue,)) as executor:
+                futures = {executor.submit(_run_job, job): job for job in batch}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        record(future.result())
+                    except BrokenProcessPool:
+                        # a worker died; we can't tell which job killed it, so retry all unfinished ones
+                        job["attempts"] += 1
+                        if job["attempts"] <= retries:
+                            pending.append(job)
+                        else:
+                            record({"id": job["id"], "status": "failed", "error": "worker process crashed",
+                                    "elapsed": 0.0})
+            if pending:
+                logger.warning(f"run_batch: worker pool crashed; retrying {len(pending)} job(s)")
+    finally:
+        stop.set()
+        reporter.join(timeout=2.0)
+        manager.shutdown()
+
+    done = sum(1 for r in results.values() if r["status"] == "done")
+    logger.info(f"run_batch: {done} done, {len(results) - done} failed, state in {state_path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Morph many (source image, video) jobs from a manifest")
+    parser.add_argument("manifest", help="jobs as JSON lines or CSV: source, video, output[, alpha, id]")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--state", default=None, help="state file (default: <manifest>.state.jsonl)")
+    parser.add_argument("--retries", type=int, default=1, help="retries for jobs lost to a crashed worker")
+    parser.add_argument("--skip-failed", action="store_true", help="don't retry jobs that failed previously")
+    args = parser.parse_args()
+
+    results = run_batch(args.manifest, args.workers, args.state, args.retries, not args.skip_failed)
+    failed = [r for r in results.values() if r["status"] != "done"]
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
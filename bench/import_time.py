@@ -0,0 +1,84 @@
+# bench/import_time.py
+#
+# Import-time budget check: each entry module is imported in a fresh
+# interpreter, its import time is measured with -X importtime and the heavy
+# optional dependencies must not have been loaded as a side effect.
+#
+#   python -m bench.import_time [--budget-ms 400]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# modules a plain import must not pull in; they load when their feature is used
+HEAVY_MODULES = ["mediapipe", "pyvirtualcam", "tkinter"]
+
+ENTRY_MODULES = [
+    "main",
+    "trial",
+    "test",
+    "morph.morph_core",
+    "morph.utils",
+    "morph.triangles",
+    "morph.engine",
+    "capture.face_tracker",
+    "capture.sources",
+    "capture.sinks",
+]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    """Import `module` in a fresh interpreter; return (cumulative_ms, heavy_modules_loaded)."""
+    code = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    cumulative_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if parts[2].strip() == module and parts[1].isdigit():
+            cumulative_us = int(parts[1])
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    return cumulative_us / 1000.0, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check per-module import time against a budget")
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="max cumulative import time per module")
+    parser.add_argument("modules", nargs="*", default=ENTRY_MODULES)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            ms, heavy = measure(module)
+        except RuntimeError as e:
+            print(f"ERROR {module}: {e}")
+            failed = True
+            continue
+        over = ms > args.budget_ms
+        status = "FAIL" if over or heavy else "ok"
+        failed = failed or over or bool(heavy)
+        extra = f" loaded {', '.join(heavy)}" if heavy else ""
+        print(f"{status:4} {module:24} {ms:8.1f} ms{extra}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
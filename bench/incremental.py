@@ -0,0 +1,99 @@
+# bench/incremental.py
+#
+# Morph cost per frame with and without incremental mode on a recorded video.
+# Landmarks are detected once up front, so only get_morphed_face is timed;
+# --jitter adds Gaussian landmark noise (px) to mimic detector jitter.
+#
+#   python -m bench.incremental --video clip.mp4 --target assets/faces/target.jpeg
+
+import argparse
+import json
+import logging
+import time
+
+import cv2
+import numpy as np
+
+from morph.morph_core import FaceMorpher
+from morph.utils import FaceUtils
+
+logger = logging.getLogger('bench')
+
+
+def load_frames(video_path, faceutils, max_frames=300):
+    """(frame, landmarks) for the first max_frames frames that have a face."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video file {video_path}")
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            points = faceutils.get_landmarks(frame)
+            if len(points) > 0:
+                frames.append((frame, points))
+    finally:
+        cap.release()
+    return frames
+
+
+def time_morph(frames, target_img, target_points, alpha=0.5, jitter=0.0, seed=0, **morpher_args):
+    """Morph every frame once; returns (ms per frame, cache stats, output frames)."""
+    morpher = FaceMorpher(**morpher_args)
+    rng = np.random.default_rng(seed)
+    outputs = []
+    start = time.perf_counter()
+    for frame, points in frames:
+        if jitter > 0:
+            points = points + rng.normal(0.0, jitter, points.shape)
+        outputs.append(morpher.get_morphed_face(frame, target_img, points, target_points, alpha))
+    elapsed = time.perf_counter() - start
+    return 1000.0 * elapsed / max(len(frames), 1), morpher.get_cache_stats(), outputs
+
+
+def run_benchmark(video_path, target_path, max_frames=300, jitters=(0.0,), composites=("hull", "triangles")):
+    faceutils = FaceUtils()
+    target_img = cv2.imread(target_path)
+    if target_img is None:
+        raise RuntimeError(f"Could not read target image {target_path}")
+    target_points = faceutils.get_landmarks(target_img, smooth=False)
+    frames = load_frames(video_path, faceutils, max_frames)
+    if not frames:
+        raise RuntimeError("no frames with a face in the video")
+
+    results = []
+    for composite in composites:
+        for jitter in jitters:
+            full_ms, _, full_out = time_morph(frames, target_img, target_points, jitter=jitter, composite=composite)
+            inc_ms, stats, inc_out = time_morph(frames, target_img, target_points, jitter=jitter,
+                                                composite=composite, incremental=True)
+            diff = max(float(np.abs(a.astype(np.int16) - b).max()) for a, b in zip(full_out, inc_out))
+            results.append({
+                "composite": composite,
+                "jitter_px": jitter,
+                "frames": len(frames),
+                "full_ms": round(full_ms, 2),
+                "incremental_ms": round(inc_ms, 2),
+                "speedup": round(full_ms / inc_ms, 2) if inc_ms else None,
+                "hit_ratio": round(stats["hit_ratio"], 3),
+                "max_pixel_diff": diff,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and incremental morph cost on a recorded video")
+    parser.add_argument("--video", required=True, help="input video")
+    parser.add_argument("--target", default="assets/faces/target.jpeg", help="target face image")
+    parser.add_argument("--frames", type=int, default=300, help="frames with a face to morph")
+    parser.add_argument("--jitter", type=float, nargs="+", default=[0.0],
+                        help="landmark noise levels in px to add (default: none)")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.video, args.target, args.frames, args.jitter), indent=2))
+
+
+if __name__ == "__main__":
+    main()
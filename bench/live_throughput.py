@@ -0,0 +1,42 @@
+# bench/live_throughput.py
+#
+# Run the real live engine (FaceTracker -> morph -> sinks) on a replayed video
+# as fast as possible, without a camera or virtual camera device.
+#
+#   python -m bench.live_throughput --video clip.mp4 --target assets/faces/target.jpeg
+
+import argparse
+import json
+import logging
+
+from capture.sources import VideoFileSource
+from capture.sinks import NullSink, VideoFileSink
+import main as live
+
+logger = logging.getLogger('bench')
+
+
+def run_benchmark(video_path, target_path, max_frames=None, output_path=None, realtime=False, loop=False):
+    # unthreaded so every frame of the recording is processed exactly once
+    source = VideoFileSource(video_path, realtime=realtime, loop=loop)
+    tracker, target_img, target_points, morph_engine = live.init_components(target_path, source=source, threaded=False)
+    sinks = [VideoFileSink(output_path)] if output_path else [NullSink()]
+    return live.run_live_morph(tracker, target_img, target_points, morph_engine, sinks=sinks, max_frames=max_frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure live morph throughput on a recorded video")
+    parser.add_argument("--video", required=True, help="input video replayed as the camera")
+    parser.add_argument("--target", default="assets/faces/target.jpeg", help="target face image")
+    parser.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--output", default=None, help="optional video file to write instead of discarding frames")
+    parser.add_argument("--realtime", action="store_true", help="replay at the video's native frame rate")
+    parser.add_argument("--loop", action="store_true", help="loop the video (use with --frames)")
+    args = parser.parse_args()
+
+    stats = run_benchmark(args.video, args.target, args.frames, args.output, args.realtime, args.loop)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
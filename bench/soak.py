@@ -0,0 +1,158 @@
+# bench/soak.py
+#
+# Long-run soak test: drive the live engine from a looping replayed video for
+# a fixed duration, sample RSS and tracemalloc, report the top growth sites
+# and per-frame allocation figures, and exit non-zero if memory keeps growing.
+#
+#   python -m bench.soak --video clip.mp4 --duration 3600 --max-growth-mb 50
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+from capture.sources import VideoFileSource
+from capture.sinks import NullSink
+import main as live
+
+logger = logging.getLogger('soak')
+
+
+def current_rss():
+    """Resident set size in bytes (Linux /proc; falls back to peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _slope(samples):
+    """Least-squares slope of (t, value) samples, in value units per second."""
+    if len(samples) < 2:
+        return 0.0
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var
+
+
+class SoakMonitor():
+    """Per-frame tracemalloc accounting plus periodic RSS samples."""
+
+    def __init__(self, warmup, top):
+        self.warmup = warmup
+        self.top = top
+        self.start = time.monotonic()
+        self.baseline = None
+        self.baseline_frame = 0
+        self.baseline_rss = None
+        self.rss_samples = []
+        self.frames = 0
+        self.peak_sum = 0
+        self.peak_frames = 0
+        self._last_current = 0
+
+    def on_frame(self, frame_count):
+        self.frames = frame_count
+        current, peak = tracemalloc.get_traced_memory()
+        if self.baseline is not None:
+            # transient allocations above the previous frame's end state
+            self.peak_sum += max(peak - self._last_current, 0)
+            self.peak_frames += 1
+        tracemalloc.reset_peak()
+        self._last_current = current
+
+        if self.baseline is None and time.monotonic() - self.start >= self.warmup:
+            self.baseline = tracemalloc.take_snapshot()
+            self.baseline_frame = frame_count
+            self.baseline_rss = current_rss()
+            logger.info(f"soak: baseline taken after {frame_count} frames, rss={self.baseline_rss / 2**20:.1f} MB")
+
+    def sample_rss(self):
+        if self.baseline is not None:
+            self.rss_samples.append((time.monotonic() - self.start, current_rss()))
+
+    def report(self):
+        if self.baseline is None:
+            raise RuntimeError("soak run ended before the warm-up period; increase --duration")
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(self.baseline, "lineno")
+        frames = max(self.frames - self.baseline_frame, 1)
+        traced_growth = sum(s.size_diff for s in stats)
+        end_rss = current_rss()
+        return {
+            "frames": self.frames,
+            "frames_after_warmup": frames,
+            "rss_start_mb": self.baseline_rss / 2**20,
+            "rss_end_mb": end_rss / 2**20,
+            "rss_growth_mb": (end_rss - self.baseline_rss) / 2**20,
+            "rss_slope_mb_per_hour": _slope(self.rss_samples) * 3600 / 2**20,
+            "traced_growth_bytes": traced_growth,
+            "traced_growth_per_frame": traced_growth / frames,
+            "transient_alloc_per_frame": self.peak_sum / max(self.peak_frames, 1),
+            "top_growth": [
+                {"site": str(s.traceback), "size_diff": s.size_diff, "count_diff": s.count_diff}
+                for s in stats[:self.top] if s.size_diff > 0
+            ],
+        }
+
+
+def run_soak(video_path, target_path, duration, warmup=30.0, sample_interval=5.0, top=10, realtime=False):
+    source = VideoFileSource(video_path, realtime=realtime, loop=True)
+    tracker, target_img, target_points, morph_engine = live.init_components(target_path, source=source, threaded=False)
+
+    tracemalloc.start()
+    monitor = SoakMonitor(warmup, top)
+    stop = threading.Event()
+
+    def sampler():
+        end = monitor.start + duration
+        while not stop.wait(sample_interval):
+            monitor.sample_rss()
+            if time.monotonic() >= end:
+                stop.set()
+
+    thread = threading.Thread(target=sampler, daemon=True)
+    thread.start()
+    try:
+        run_stats = live.run_live_morph(tracker, target_img, target_points, morph_engine, sinks=[NullSink()],
+                                        stop_event=stop, on_frame=monitor.on_frame)
+    finally:
+        stop.set()
+        thread.join()
+    report = monitor.report()
+    report["fps"] = run_stats["fps"]
+    tracemalloc.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the live engine for memory growth")
+    parser.add_argument("--video", required=True, help="video replayed (looped) as the camera")
+    parser.add_argument("--target", default="assets/faces/target.jpeg")
+    parser.add_argument("--duration", type=float, default=600.0, help="seconds to run")
+    parser.add_argument("--warmup", type=float, default=30.0, help="seconds before the baseline is taken")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="seconds between RSS samples")
+    parser.add_argument("--max-growth-mb", type=float, default=50.0, help="fail if RSS grows more than this")
+    parser.add_argument("--top", type=int, default=10, help="growth sites to report")
+    parser.add_argument("--realtime", action="store_true", help="replay at native frame rate")
+    args = parser.parse_args()
+
+    report = run_soak(args.video, args.target, args.duration, args.warmup, args.sample_interval, args.top, args.realtime)
+    print(json.dumps(report, indent=2))
+    if report["rss_growth_mb"] > args.max_growth_mb:
+        print(f"FAIL: RSS grew {report['rss_growth_mb']:.1f} MB (limit {args.max_growth_mb} MB)")
+        raise SystemExit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
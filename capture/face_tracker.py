@@ -1,42 +1,169 @@
 # capture/face_tracker.py
 
 import cv2
-import mediapipe as mp
-import pyvirtualcam as pvc
+from capture.output_pacer import OutputPacer
+from capture.sources import WebcamSource
+from capture.sinks import VirtualCamSink, PreviewSink
 import time
+import threading
 import logging
 
 logger = logging.getLogger('face_tracker')
 
+# (fourcc, width, height, fps) combinations tried by probe_capture_modes
+DEFAULT_PROBE_MODES = [
+    ("MJPG", 1920, 1080, 30),
+    ("MJPG", 1280, 720, 60),
+    ("MJPG", 1280, 720, 30),
+    ("MJPG", 640, 480, 30),
+    ("YUYV", 1280, 720, 10),
+    ("YUYV", 640, 480, 30),
+]
+
+# consecutive failed reads after which a (non-finite) source is treated as lost, e.g. an unplugged camera
+MAX_READ_FAILURES = 30
+
+
+def decode_fourcc(value):
+    """Turn the float returned by CAP_PROP_FOURCC into a 4-character string."""
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+
+def read_capture_format(video):
+    """Return the format a VideoCapture (or compatible object) is actually delivering."""
+    return {
+        "fourcc": decode_fourcc(video.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": float(video.get(cv2.CAP_PROP_FPS)),
+        "buffer_size": int(video.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+
+def apply_capture_format(video, fourcc=None, width=None, height=None, fps=None, buffer_size=None):
+    """Request a capture format and return what the driver granted.
+
+    The fourcc is set first since V4L2 drivers only expose the high
+    resolution / frame rate modes once the compressed format is selected.
+    """
+    if fourcc:
+        video.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+    if width:
+        video.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    if height:
+        video.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        video.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        video.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return read_capture_format(video)
+
+
+def probe_capture_modes(video, modes=None):
+    """Try each (fourcc, width, height, fps) mode on an open camera and return the granted ones.
+
+    The mode the capture was in before probing is restored afterwards.
+    """
+    original = read_capture_format(video)
+    supported = []
+    try:
+        for fourcc, width, height, fps in (modes or DEFAULT_PROBE_MODES):
+            granted = apply_capture_format(video, fourcc, width, height, fps)
+            ok = (granted["fourcc"] == fourcc and granted["width"] == width
+                  and granted["height"] == height and abs(granted["fps"] - fps) < 1.0)
+            logger.debug(f"probe_capture_modes: requested {fourcc} {width}x{height}@{fps} -> {granted}")
+            if ok:
+                supported.append(granted)
+    finally:
+        restored = apply_capture_format(video, original["fourcc"], original["width"], original["height"],
+                                        original["fps"])
+        if restored != original:
+            logger.warning(f"probe_capture_modes: could not restore {original}, capture is now {restored}")
+    return supported
+
+
+def list_camera_modes(cam_index, modes=None):
+    """Open a camera, enumerate which of the candidate modes it supports, and release it."""
+    video = cv2.VideoCapture(cam_index, cv2.CAP_V4L2)
+    try:
+        if not video.isOpened():
+            raise RuntimeError(f"cv2.VideoCapture could not open index {cam_index}")
+        return probe_capture_modes(video, modes)
+    finally:
+        video.release()
+
 
 class FaceTracker:
-    def __init__(self, cam_index=1, virt_cam_device="/dev/video10", fps=30):
+    def __init__(self, cam_index=1, virt_cam_device="/dev/video10", fps=30, threaded=False,
+                 fourcc=None, capture_width=None, capture_height=None, capture_fps=None, buffer_size=None,
+                 source=None):
         self.cam_index = cam_index
+        # any capture.sources.FrameSource (webcam, video file replay, image sequence)
+        self.source = source if source is not None else WebcamSource(cam_index)
         self.virt_cam_device = virt_cam_device
         self.fps = fps
+        # requested camera format (None keeps the driver default); see apply_capture_format
+        self.fourcc = fourcc
+        self.capture_width = capture_width
+        self.capture_height = capture_height
+        self.capture_fps = capture_fps
+        self.buffer_size = buffer_size
+        self.granted_format = None
+        # threaded: grab frames on a background thread and hand out only the newest one,
+        # so slow processing never lets the driver queue stale frames
+        self.threaded = threaded
 
-        # Initialize Mediapipe Face Mesh (kept in __init__)
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
-
-        self.drawing_utils = mp.solutions.drawing_utils
-        self.draw_specs = self.drawing_utils.DrawingSpec(
-            thickness=1, circle_radius=1, color=(0, 200, 0)
-        )
+        # Mediapipe Face Mesh is only needed by process_frame(); built on first use so
+        # callers that just read frames don't pay for importing / constructing it
+        self._face_mesh = None
+        self.drawing_utils = None
+        self.draw_specs = None
 
         # Delay opening the real webcam until run()/read() to avoid "device in use" errors
         self.video = None
         self.width = None
         self.height = None
+        self._pending_frame = None
 
         # Virtual camera will be opened after we know frame size
         self.cam = None
+        self.pacer = None
+
+        # latest-frame slot filled by the capture thread (threaded mode)
+        self._capture_thread = None
+        self._capture_stop = threading.Event()
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._latest_ts = None
+        self._latest_seq = 0
+        self._last_read_seq = 0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        # exception that ended the capture thread, if any
+        self.capture_error = None
+        # set once no more frames will come from a non-finite source, see `stopped`
+        self._capture_ended = False
+        self._read_failures = 0
+
+    @property
+    def face_mesh(self):
+        if self._face_mesh is None:
+            import mediapipe as mp
+            self.mp_face_mesh = mp.solutions.face_mesh
+            self._face_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
+
+            self.drawing_utils = mp.solutions.drawing_utils
+            self.draw_specs = self.drawing_utils.DrawingSpec(
+                thickness=1, circle_radius=1, color=(0, 200, 0)
+            )
+        return self._face_mesh
 
     def process_frame(self, frame):
         """Detect landmarks and draw them."""
@@ -65,15 +192,12 @@ class FaceTracker:
         last_err = None
         for attempt in range(1, retries + 1):
             try:
-                logger.info(f"open_video: attempt {attempt} to open camera index {self.cam_index}")
-                # Prefer V4L2 backend on Linux for reliability; fallback to default if unavailable
-                try:
-                    self.video = cv2.VideoCapture(self.cam_index, cv2.CAP_V4L2)
-                except Exception:
-                    self.video = cv2.VideoCapture(self.cam_index)
+                logger.info(f"open_video: attempt {attempt} to open {type(self.source).__name__} (camera index {self.cam_index})")
+                self.source.open()
+                self.video = self.source
 
                 if not self.video or not self.video.isOpened():
-                    last_err = RuntimeError(f"cv2.VideoCapture could not open index {self.cam_index}")
+                    last_err = RuntimeError(f"could not open {type(self.source).__name__} (camera index {self.cam_index})")
                     # make sure to release any partial handle
                     try:
                         if self.video:
@@ -87,6 +211,8 @@ class FaceTracker:
                         continue
                     raise last_err
 
+                self.negotiate_format()
+
                 # try a read to confirm camera is usable
                 ret, frame = self.video.read()
                 if not ret or frame is None:
@@ -102,6 +228,8 @@ class FaceTracker:
                         continue
                     raise last_err
 
+                # hand the probe frame out on the next read so finite sources lose nothing
+                self._pending_frame = frame
                 self.height, self.width = frame.shape[:2]
                 logger.info(f"open_video: camera opened, resolution={self.width}x{self.height}")
                 return
@@ -117,94 +245,280 @@ class FaceTracker:
         )
 
 
+    def negotiate_format(self):
+        """Apply the requested fourcc/size/fps/buffer size and log what the driver granted."""
+        requested = {
+            "fourcc": self.fourcc,
+            "width": self.capture_width,
+            "height": self.capture_height,
+            "fps": self.capture_fps,
+            "buffer_size": self.buffer_size,
+        }
+        try:
+            self.granted_format = apply_capture_format(
+                self.video, self.fourcc, self.capture_width, self.capture_height,
+                self.capture_fps, self.buffer_size,
+            )
+        except Exception as e:
+            logger.warning(f"negotiate_format: could not apply capture format: {e}")
+            return None
+
+        granted = self.granted_format
+        logger.info(f"negotiate_format: camera granted {granted['fourcc']} {granted['width']}x{granted['height']}"
+                    f"@{granted['fps']:.1f} buffer={granted['buffer_size']}")
+        mismatched = [k for k, v in requested.items() if v and (
+            abs(granted[k] - v) >= 1.0 if k == "fps" else granted[k] != v)]
+        if mismatched:
+            logger.warning(f"negotiate_format: driver did not grant {', '.join(mismatched)} "
+                           f"(requested {requested})")
+        return granted
+
+    @property
+    def exhausted(self):
+        """True once a finite source (video file, image sequence) has run out of frames."""
+        return getattr(self.source, "exhausted", False)
+
+    @property
+    def stopped(self):
+        """True once no more frames will come: the source is exhausted, the capture thread has
+        ended (too many failed reads or an exception, see capture_error) or unthreaded reads
+        kept failing."""
+        return self.exhausted or self._capture_ended or self.capture_error is not None
+
     def open_virtual_cam(self):
         """Attempt to open the virtual camera; if it fails, fall back to local display."""
         if self.cam is not None:
             return
 
         try:
-            # pyvirtualcam expects frames in RGB by default when using send(...)
-            self.cam = pvc.Camera(width=self.width, height=self.height, fps=self.fps, device=self.virt_cam_device)
-            logger.info(f"Using virtual camera: {self.cam.device}")
+            cam = VirtualCamSink(self.virt_cam_device)
+            cam.open(self.width, self.height, self.fps)
+            self.cam = cam
         except Exception as e:
             # don't raise here; just warn and fall back to imshow
             logger.warning(f"could not open virtual camera '{self.virt_cam_device}': {e} - falling back to local display")
             self.cam = None
 
+    def start_capture(self):
+        """Open the webcam and start the background capture thread (threaded mode)."""
+        if self._capture_thread is not None and self._capture_thread.is_alive():
+            return
+        self.open_video()
+        self._capture_stop.clear()
+        self._capture_ended = False
+        if self._pending_frame is not None:
+            with self._frame_cond:
+                self._latest_frame = self._pending_frame
+                self._latest_ts = time.monotonic()
+                self._latest_seq += 1
+                self.captured_frames += 1
+            self._pending_frame = None
+        self._capture_thread = threading.Thread(target=self._capture_loop, name="FaceTrackerCapture", daemon=True)
+        self._capture_thread.start()
+        logger.info("start_capture: background capture thread started")
+
+    def _capture_loop(self):
+        try:
+            self._capture_frames()
+        except Exception as e:
+            logger.exception(f"_capture_loop: capture thread died: {e}")
+            self.capture_error = e
+        finally:
+            # wake readers however the loop ended, so read() can report the end of the stream
+            self._capture_ended = True
+            self._capture_stop.set()
+            with self._frame_cond:
+                self._frame_cond.notify_all()
+
+    def _capture_frames(self):
+        failures = 0
+        while not self._capture_stop.is_set():
+            try:
+                ret, frame = self.video.read()
+            except Exception as e:
+                logger.warning(f"_capture_loop: read raised {e}")
+                ret, frame = False, None
+            ts = time.monotonic()
+
+            if not ret or frame is None:
+                if self.exhausted:
+                    logger.info("_capture_loop: source exhausted; stopping capture")
+                    break
+                failures += 1
+                if failures >= MAX_READ_FAILURES:
+                    logger.error("_capture_loop: too many consecutive read failures; stopping capture")
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+
+            with self._frame_cond:
+                # the previous frame was never consumed -> it is dropped
+                if self._latest_seq > self._last_read_seq:
+                    self.dropped_frames += 1
+                self._latest_frame = frame
+                self._latest_ts = ts
+                self._latest_seq += 1
+                self.captured_frames += 1
+                self._frame_cond.notify_all()
+
+    def stop_capture(self):
+        self._capture_stop.set()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=2.0)
+            self._capture_thread = None
+
+    def get_capture_stats(self):
+        with self._frame_cond:
+            age = time.monotonic() - self._latest_ts if self._latest_ts is not None else None
+            return {
+                "captured": self.captured_frames,
+                "dropped": self.dropped_frames,
+                "seq": self._latest_seq,
+                "latest_age": age,
+                "error": repr(self.capture_error) if self.capture_error is not None else None,
+            }
+
+    def release(self):
+        """Stop capture and release the webcam."""
+        self.stop_capture()
+        try:
+            if self.video:
+                self.video.release()
+        except Exception:
+            pass
+        self.video = None
+
+    def close_virtual_cam(self):
+        if self.pacer is not None:
+            logger.info(f"close_virtual_cam: output stats {self.pacer.get_stats()}")
+            self.pacer.stop()
+            self.pacer = None
+        try:
+            if self.cam:
+                self.cam.close()
+        except Exception:
+            pass
+        self.cam = None
+
     def run(self):
         try:
             # open camera lazily (this may raise RuntimeError which we let bubble up)
             self.open_video()
+            if self.threaded:
+                self.start_capture()
         except RuntimeError as e:
             print(e)
             return
 
         # try virtual cam; if it fails we'll show via imshow
         self.open_virtual_cam()
+        if self.cam:
+            self.pacer = OutputPacer(self.cam, self.fps)
+            self.pacer.start()
+        preview = None
 
         try:
             while True:
-                ret, frame = self.video.read()
-                if not ret or frame is None:
+                frame = self.read()
+                if frame is None:
                     logger.warning("run: failed to read frame from camera; exiting loop")
                     break
 
                 processed = self.process_frame(frame)
 
-                if self.cam:
-                    # pyvirtualcam expects RGB frames by default
-                    try:
-                        logger.debug("run: sending frame to virtual camera")
-                        self.cam.send(processed)
-                        self.cam.sleep_until_next_frame()
-                        logger.debug("run: frame sent to virtual camera")
-                    except Exception as e:
-                        logger.error(f"Virtual cam error: {e} - falling back to local display.")
-                        try:
-                            self.cam.close()
-                        except Exception:
-                            pass
-                        self.cam = None
-                        bgr = cv2.cvtColor(processed, cv2.COLOR_RGB2BGR)
-                        cv2.imshow("FaceTracker", bgr)
-                        if cv2.waitKey(1) & 0xFF == ord('q'):
-                            break
+                if self.pacer and self.pacer.failed:
+                    logger.error("Virtual cam output failed - falling back to local display.")
+                    self.close_virtual_cam()
+
+                # sinks take BGR frames
+                bgr = cv2.cvtColor(processed, cv2.COLOR_RGB2BGR)
+                if self.pacer:
+                    # the pacer sends to the virtual camera at a steady rate
+                    self.pacer.submit(bgr)
                 else:
-                    bgr = cv2.cvtColor(processed, cv2.COLOR_RGB2BGR)
-                    cv2.imshow("FaceTracker", bgr)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                    if preview is None:
+                        preview = PreviewSink("FaceTracker")
+                        preview.open(self.width, self.height, self.fps)
+                    preview.send(bgr)
+                    if preview.closed:
                         break
         finally:
             # cleanup resources
-            try:
-                if self.video:
-                    self.video.release()
-            except Exception:
-                pass
-            try:
-                if self.cam:
-                    self.cam.close()
-            except Exception:
-                pass
-            cv2.destroyAllWindows()
+            self.release()
+            self.close_virtual_cam()
+            if preview is not None:
+                preview.close()
             logger.info("Stream ended.")
 
-    def read(self):
-        """Read a single frame from the webcam."""
+    def read(self, with_meta=False, timeout=1.0):
+        """Read a single frame from the webcam.
+
+        In threaded mode this returns the newest captured frame (waiting up to
+        `timeout` seconds for one that has not been returned yet). With
+        `with_meta=True` a (frame, capture_timestamp, sequence_number) tuple is
+        returned instead; the timestamp is time.monotonic() at capture.
+        """
+        if self.threaded:
+            return self._read_latest(with_meta, timeout)
+
         # open lazily if needed
         try:
             if self.video is None or not getattr(self.video, 'isOpened', lambda: False)():
                 self.open_video()
         except RuntimeError:
-            return None
+            return (None, None, None) if with_meta else None
 
-        try:
-            ret, frame = self.video.read()
-            if not ret:
-                return None
+        frame, self._pending_frame = self._pending_frame, None
+        if frame is None:
+            try:
+                ret, frame = self.video.read()
+                if not ret:
+                    frame = None
+            except Exception:
+                frame = None
+            if frame is None and not self.exhausted:
+                self._read_failures += 1
+                if self._read_failures == MAX_READ_FAILURES:
+                    logger.error("read: too many consecutive read failures; treating the source as lost")
+                    self._capture_ended = True
+            elif frame is not None:
+                self._read_failures = 0
+
+        if not with_meta:
             return frame
-        except Exception:
-            return None
+        if frame is None:
+            return None, None, None
+        self._latest_seq += 1
+        self.captured_frames += 1
+        return frame, time.monotonic(), self._latest_seq
+
+    def _read_latest(self, with_meta, timeout):
+        try:
+            if self._capture_thread is None:
+                self.start_capture()
+        except RuntimeError:
+            return (None, None, None) if with_meta else None
+
+        thread = self._capture_thread
+        with self._frame_cond:
+            self._frame_cond.wait_for(
+                lambda: self._latest_seq > self._last_read_seq or self._capture_stop.is_set()
+                or thread is None or not thread.is_alive(),
+                timeout=timeout,
+            )
+            frame, ts, seq = self._latest_frame, self._latest_ts, self._latest_seq
+            # no new frame will come once the capture thread has stopped (or died)
+            stopped = self._capture_stop.is_set() or thread is None or not thread.is_alive()
+            if stopped and seq <= self._last_read_seq:
+                frame = None
+            self._last_read_seq = seq
+
+        if with_meta:
+            return (frame, ts, seq) if frame is not None else (None, None, None)
+        return frame
 
 
 if __name__ == "__main__":
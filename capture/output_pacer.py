@@ -0,0 +1,94 @@
+# capture/output_pacer.py
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger('output_pacer')
+
+
+class OutputPacer(threading.Thread):
+    """Send frames to a virtual camera at a steady rate on a dedicated thread.
+
+    The processing loop hands over frames with submit(), which never blocks.
+    Every tick the pacer sends the newest submitted frame; when processing is
+    late the previous frame is repeated (counted in duplicated_frames), and
+    frames replaced before they were sent are counted in skipped_frames.
+    Submitted frames are sent as-is, so the caller must not modify them afterwards.
+    """
+
+    def __init__(self, cam, fps=30, max_errors=30):
+        super().__init__(daemon=True, name="OutputPacer")
+        self.cam = cam
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.max_errors = max_errors
+
+        self.lock = threading.Lock()
+        self.latest_frame = None
+        self.latest_seq = 0
+        self.sent_seq = 0
+        self.stop_flag = threading.Event()
+        self.failed = False
+
+        self.sent_frames = 0
+        self.duplicated_frames = 0
+        self.skipped_frames = 0
+        self.late_ticks = 0
+        self.send_errors = 0
+
+    def submit(self, frame):
+        with self.lock:
+            if self.latest_seq > self.sent_seq:
+                self.skipped_frames += 1
+            self.latest_frame = frame
+            self.latest_seq += 1
+
+    def run(self):
+        next_tick = time.monotonic()
+        consecutive_errors = 0
+        while not self.stop_flag.is_set():
+            with self.lock:
+                frame = self.latest_frame
+                if frame is not None and self.latest_seq == self.sent_seq:
+                    self.duplicated_frames += 1
+                self.sent_seq = self.latest_seq
+
+            if frame is not None:
+                try:
+                    self.cam.send(frame)
+                    self.sent_frames += 1
+                    consecutive_errors = 0
+                except Exception as e:
+                    self.send_errors += 1
+                    consecutive_errors += 1
+                    logger.error(f"run: failed to send frame to virtual camera: {e}")
+                    if consecutive_errors >= self.max_errors:
+                        logger.error("run: too many consecutive send errors; stopping output")
+                        self.failed = True
+                        break
+
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self.stop_flag.wait(delay)
+            else:
+                self.late_ticks += 1
+                # more than a whole period behind: resync instead of bursting to catch up
+                if -delay > self.period:
+                    next_tick = time.monotonic()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "sent": self.sent_frames,
+                "duplicated": self.duplicated_frames,
+                "skipped": self.skipped_frames,
+                "late_ticks": self.late_ticks,
+                "errors": self.send_errors,
+            }
+
+    def stop(self):
+        self.stop_flag.set()
+        if self.is_alive():
+            self.join(timeout=2.0)
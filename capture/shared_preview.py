@@ -0,0 +1,152 @@
+# capture/shared_preview.py
+#
+# Decimated live preview through a multiprocessing.shared_memory ring buffer.
+# The processing side publishes with SharedMemorySink (a plain FrameSink, no
+# GUI calls); a viewer in another process (the Tk control panel) attaches by
+# name with SharedMemoryPreview and polls the newest frame at its own rate.
+#
+# Layout: an int64 header [magic, slots, height, width, channels, latest_seq],
+# then one int64 sequence number per slot, then `slots` frames of uint8 BGR.
+# A slot's sequence number is set to -1 while it is written, so a reader that
+# sees the same valid number before and after copying has an untorn frame.
+
+import logging
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from capture.sinks import FrameSink
+
+logger = logging.getLogger('shared_preview')
+
+MAGIC = 0x464D5056  # "FMPV"
+HEADER_FIELDS = 6
+
+
+def _layout(slots, height, width, channels):
+    header = (HEADER_FIELDS + slots) * 8
+    frame_bytes = height * width * channels
+    return header, frame_bytes, header + slots * frame_bytes
+
+
+class SharedMemorySink(FrameSink):
+    """Publish a downscaled copy of every `every`-th frame into a named shared-memory ring."""
+
+    def __init__(self, name, max_width=480, every=2, slots=3):
+        super().__init__()
+        self.name = name
+        self.max_width = max_width
+        self.every = max(1, every)
+        self.slots = slots
+        self.shm = None
+        self.size = None
+        self._seq = 0
+        self._count = 0
+
+    def open(self, width, height, fps):
+        scale = min(1.0, self.max_width / float(width))
+        self.size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        pw, ph = self.size
+        header, _, total = _layout(self.slots, ph, pw, 3)
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=total)
+
+        self._header = np.ndarray((HEADER_FIELDS + self.slots,), dtype=np.int64, buffer=self.shm.buf)
+        self._frames = np.ndarray((self.slots, ph, pw, 3), dtype=np.uint8, buffer=self.shm.buf, offset=header)
+        self._header[:] = [0, self.slots, ph, pw, 3, 0] + [0] * self.slots
+        # magic last: a reader never sees a half-initialised header
+        self._header[0] = MAGIC
+        logger.info(f"SharedMemorySink: publishing {pw}x{ph} preview to shared memory '{self.name}'")
+
+    def send(self, frame):
+        self._count += 1
+        if self._count % self.every:
+            return
+        self._seq += 1
+        slot = self._seq % self.slots
+        self._header[HEADER_FIELDS + slot] = -1
+        if frame.shape[1] == self.size[0] and frame.shape[0] == self.size[1]:
+            self._frames[slot] = frame
+        else:
+            # resize straight into the shared slot: no intermediate copy. INTER_LINEAR is ~10x
+            # cheaper than INTER_AREA here and good enough for a preview
+            cv2.resize(frame, self.size, dst=self._frames[slot], interpolation=cv2.INTER_LINEAR)
+        self._header[HEADER_FIELDS + slot] = self._seq
+        self._header[5] = self._seq
+        self.frames_sent += 1
+
+    def close(self):
+        if self.shm is None:
+            return
+        self._header = self._frames = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class SharedMemoryPreview:
+    """Read side of SharedMemorySink; attach() fails until the publisher has opened the ring."""
+
+    def __init__(self, name):
+        self.name = name
+        self.shm = None
+        self.last_seq = 0
+
+    def attach(self):
+        """Try to attach; returns True once the ring exists and is initialised."""
+        if self.shm is not None:
+            return True
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+        # the publisher owns the segment; don't let this process's resource tracker unlink it on exit
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if header[0] != MAGIC:
+            del header
+            shm.close()
+            return False
+        slots, height, width, channels = (int(v) for v in header[1:5])
+        offset, _, _ = _layout(slots, height, width, channels)
+        self._header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=shm.buf)
+        self._frames = np.ndarray((slots, height, width, channels), dtype=np.uint8, buffer=shm.buf, offset=offset)
+        self.slots = slots
+        self.shm = shm
+        return True
+
+    def read(self):
+        """Newest frame (BGR copy) if one arrived since the last read, else None."""
+        if self.shm is None:
+            return None
+        seq = int(self._header[5])
+        if seq <= self.last_seq:
+            return None
+        slot = seq % self.slots
+        if self._header[HEADER_FIELDS + slot] != seq:
+            return None
+        frame = self._frames[slot].copy()
+        if self._header[HEADER_FIELDS + slot] != seq:
+            # overwritten while copying; the next poll picks up a newer frame
+            return None
+        self.last_seq = seq
+        return frame
+
+    def close(self):
+        if self.shm is None:
+            return
+        self._header = self._frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        self.shm = None
+        self.last_seq = 0
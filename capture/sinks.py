@@ -0,0 +1,188 @@
+# capture/sinks.py
+
+import collections
+import logging
+import os
+
+import cv2
+
+logger = logging.getLogger('sinks')
+
+
+class FrameSink:
+    """Base class for frame consumers.
+
+    Sinks receive BGR frames via send() after open(width, height, fps).
+    `realtime` sinks (e.g. a virtual camera) expect a steady frame rate and
+    are driven through an OutputPacer by the live loop; the others are fed
+    directly. `closed` is set when the sink asks the loop to stop (e.g. ESC).
+    """
+
+    realtime = False
+
+    def __init__(self):
+        self.closed = False
+        self.frames_sent = 0
+
+    def open(self, width, height, fps):
+        pass
+
+    def send(self, frame):
+        self.frames_sent += 1
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class VirtualCamSink(FrameSink):
+    """Send frames to a pyvirtualcam device (v4l2loopback on Linux)."""
+
+    realtime = True
+
+    def __init__(self, device="/dev/video10"):
+        super().__init__()
+        self.device = device
+        self.cam = None
+
+    def open(self, width, height, fps):
+        import pyvirtualcam
+        self.cam = pyvirtualcam.Camera(width=width, height=height, fps=fps, device=self.device)
+        logger.info(f"VirtualCamSink: using virtual camera {self.cam.device}")
+
+    def send(self, frame):
+        # pyvirtualcam expects RGB frames by default; convert from BGR
+        self.cam.send(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        self.frames_sent += 1
+
+    def close(self):
+        if self.cam is not None:
+            try:
+                self.cam.close()
+            except Exception:
+                pass
+        self.cam = None
+
+
+class PreviewSink(FrameSink):
+    """Show frames in an OpenCV window; ESC marks the sink closed.
+
+    With show_frames=False only a small window is kept open to receive
+    keyboard events, which avoids the per-frame imshow cost.
+    """
+
+    def __init__(self, window_name="FaceMorph Live", show_frames=True):
+        super().__init__()
+        self.window_name = window_name
+        self.show_frames = show_frames
+
+    def open(self, width, height, fps):
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        if not self.show_frames:
+            cv2.resizeWindow(self.window_name, 400, 100)
+
+    def send(self, frame):
+        if self.show_frames:
+            cv2.imshow(self.window_name, frame)
+        self.frames_sent += 1
+        if cv2.waitKey(1) & 0xFF == 27:
+            logger.info("PreviewSink: ESC pressed")
+            self.closed = True
+
+    def close(self):
+        try:
+            cv2.destroyWindow(self.window_name)
+        except Exception:
+            pass
+
+
+class VideoFileSink(FrameSink):
+    """Encode frames to a video file with cv2.VideoWriter."""
+
+    def __init__(self, path, fourcc="mp4v"):
+        super().__init__()
+        self.path = path
+        self.fourcc = fourcc
+        self.writer = None
+
+    def open(self, width, height, fps):
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), fps, (width, height))
+        if not self.writer.isOpened():
+            raise RuntimeError(f"could not open video writer for {self.path}")
+
+    def send(self, frame):
+        self.writer.write(frame)
+        self.frames_sent += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+        self.writer = None
+
+
+class NullSink(FrameSink):
+    """Discard frames; used to measure raw engine throughput."""
+
+
+class MemorySink(FrameSink):
+    """Keep sent frames in memory (the most recent max_frames if given)."""
+
+    def __init__(self, max_frames=None):
+        super().__init__()
+        self.frames = collections.deque(maxlen=max_frames)
+
+    def send(self, frame):
+        self.frames.append(frame)
+        self.frames_sent += 1
+
+
+class ImageSequenceSink(FrameSink):
+    """Write each frame as an image file; `pattern` is formatted with the frame index,
+    e.g. "out/frame_{:05d}.png"."""
+
+    def __init__(self, pattern):
+        super().__init__()
+        self.pattern = pattern
+
+    def open(self, width, height, fps):
+        directory = os.path.dirname(self.pattern.format(0))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def send(self, frame):
+        path = self.pattern.format(self.frames_sent)
+        if not cv2.imwrite(path, frame):
+            raise RuntimeError(f"could not write {path}")
+        self.frames_sent += 1
+
+
+class GifSink(FrameSink):
+    """Collect frames and write an animated GIF on close (requires Pillow)."""
+
+    def __init__(self, path, loop=0):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.frames = []
+        self.duration = 33
+
+    def open(self, width, height, fps):
+        from PIL import Image  # noqa: F401  (fail early if Pillow is missing)
+        self.duration = int(round(1000.0 / fps))
+        self.frames = []
+
+    def send(self, frame):
+        from PIL import Image
+        self.frames.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+        self.frames_sent += 1
+
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.path, save_all=True, append_images=self.frames[1:],
+                                duration=self.duration, loop=self.loop)
+        self.frames = []
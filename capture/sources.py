@@ -0,0 +1,207 @@
+# capture/sources.py
+
+import glob
+import os
+import time
+import logging
+
+import cv2
+
+logger = logging.getLogger('sources')
+
+
+class FrameSource:
+    """Base class for frame producers.
+
+    Sources mimic the cv2.VideoCapture interface (isOpened/read/get/set/release)
+    so FaceTracker and the capture helpers can use them interchangeably.
+    `exhausted` is set once a finite source has no more frames.
+    """
+
+    def __init__(self):
+        self.exhausted = False
+
+    def open(self):
+        pass
+
+    def isOpened(self):
+        return False
+
+    def read(self):
+        return False, None
+
+    def get(self, prop):
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class WebcamSource(FrameSource):
+    """A physical camera opened through cv2.VideoCapture (V4L2 preferred)."""
+
+    def __init__(self, cam_index=1, backend=cv2.CAP_V4L2):
+        super().__init__()
+        self.cam_index = cam_index
+        self.backend = backend
+        self.video = None
+
+    def open(self):
+        self.release()
+        # Prefer V4L2 backend on Linux for reliability; fallback to default if unavailable
+        try:
+            self.video = cv2.VideoCapture(self.cam_index, self.backend)
+        except Exception:
+            self.video = cv2.VideoCapture(self.cam_index)
+
+    def isOpened(self):
+        return self.video is not None and self.video.isOpened()
+
+    def read(self):
+        if self.video is None:
+            return False, None
+        return self.video.read()
+
+    def get(self, prop):
+        return self.video.get(prop) if self.video is not None else 0.0
+
+    def set(self, prop, value):
+        return self.video.set(prop, value) if self.video is not None else False
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+        self.video = None
+
+
+class VideoFileSource(FrameSource):
+    """Replay a recorded video, either at its native frame rate or as fast as possible."""
+
+    def __init__(self, path, realtime=True, loop=False):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.video = None
+        self.fps = 0.0
+        self._next_frame_time = None
+
+    def open(self):
+        self.release()
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"video file not found: {self.path}")
+        self.video = cv2.VideoCapture(self.path)
+        self.fps = self.video.get(cv2.CAP_PROP_FPS) or 30.0
+        self.exhausted = False
+        self._next_frame_time = None
+        logger.info(f"VideoFileSource: opened {self.path} fps={self.fps:.1f} realtime={self.realtime} loop={self.loop}")
+
+    def isOpened(self):
+        return self.video is not None and self.video.isOpened()
+
+    def read(self):
+        if self.video is None or self.exhausted:
+            return False, None
+
+        ret, frame = self.video.read()
+        if not ret and self.loop:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.video.read()
+        if not ret:
+            self.exhausted = True
+            return False, None
+
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_frame_time is None:
+                self._next_frame_time = now
+            delay = self._next_frame_time - now
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame_time = max(self._next_frame_time, now - 1.0 / self.fps) + 1.0 / self.fps
+        return True, frame
+
+    def get(self, prop):
+        return self.video.get(prop) if self.video is not None else 0.0
+
+    def set(self, prop, value):
+        # format negotiation does not apply to files; report the native mode via get()
+        return False
+
+    def release(self):
+        if self.video is not None:
+            self.video.release()
+        self.video = None
+
+
+class ImageSequenceSource(FrameSource):
+    """Read frames from a list of image paths or a glob pattern, in sorted order."""
+
+    def __init__(self, images, fps=30.0, realtime=False, loop=False):
+        super().__init__()
+        if isinstance(images, str):
+            self.paths = sorted(glob.glob(images))
+        else:
+            self.paths = list(images)
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.index = 0
+        self.width = 0
+        self.height = 0
+        self._opened = False
+        self._next_frame_time = None
+
+    def open(self):
+        if not self.paths:
+            raise FileNotFoundError("image sequence is empty")
+        self.index = 0
+        self.exhausted = False
+        self._opened = True
+        self._next_frame_time = None
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened or self.exhausted:
+            return False, None
+        if self.index >= len(self.paths):
+            if not self.loop:
+                self.exhausted = True
+                return False, None
+            self.index = 0
+
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        if frame is None:
+            logger.warning(f"ImageSequenceSource: could not read {self.paths[self.index - 1]}")
+            return False, None
+        self.height, self.width = frame.shape[:2]
+
+        if self.realtime:
+            now = time.monotonic()
+            if self._next_frame_time is None:
+                self._next_frame_time = now
+            delay = self._next_frame_time - now
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame_time = max(self._next_frame_time, now - 1.0 / self.fps) + 1.0 / self.fps
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.paths))
+        return 0.0
+
+    def release(self):
+        self._opened = False
@@ -1,10 +1,14 @@
 from capture.face_tracker import FaceTracker
 from morph.utils import FaceUtils
 from morph.morph_core import FaceMorpher
+from capture.output_pacer import OutputPacer
+from capture.sinks import VirtualCamSink, PreviewSink
+from capture.shared_preview import SharedMemorySink
+from morph.engine import LiveEngine
+from misc.profiler import SamplingProfiler
 import cv2
 import os
-import pyvirtualcam
-import threading
+import time
 import logging
 
 # basic logger for diagnostics
@@ -12,9 +16,23 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(na
 logger = logging.getLogger('vibe')
 
 
-faceutils = FaceUtils()
+# process start, used for the time-to-first-morphed-frame metric
+_start_time = time.perf_counter()
 
-def init_components(source_path):
+# FaceMesh is built on first use (not at import); live landmarks are smoothed
+# with a One-Euro filter to remove jitter on a still face
+_faceutils = None
+
+
+def get_faceutils():
+    global _faceutils
+    if _faceutils is None:
+        _faceutils = FaceUtils(landmark_filter=True)
+    return _faceutils
+
+
+def init_components(source_path, incremental=True, source=None, threaded=True, canonical_size=None,
+                    composite="hull", feather=0.0):
     if not os.path.exists(source_path):
         raise FileNotFoundError("Source image not found")
     
@@ -23,12 +41,15 @@ def init_components(source_path):
         raise ValueError("Error reading Image")
     # keep as BGR here; FaceUtils.get_landmarks expects BGR and will convert internally
 
-    target_points = faceutils.get_landmarks(target_img)
+    target_points = get_faceutils().get_landmarks(target_img, smooth=False)
     if target_points is None or len(target_points)==0:
         raise RuntimeError("Face Not Detected")
 
     try:
-        tracker = FaceTracker()
+        # threaded capture keeps only the newest camera frame to bound latency;
+        # MJPG lets most USB webcams deliver 720p30 instead of low-rate YUYV
+        tracker = FaceTracker(threaded=threaded, fourcc="MJPG", capture_width=1280, capture_height=720,
+                              capture_fps=30, buffer_size=1, source=source)
         logger.info("Tracker initialised")
     except Exception as e:
         # If tracker cannot initialize we'll raise so the caller handles it
@@ -38,7 +59,14 @@ def init_components(source_path):
     if tracker is None:
         raise RuntimeError("Could not initialize FaceTracker")
     
-    morph_engine = FaceMorpher()
+    # incremental: only re-warp triangles that moved since the previous frame
+    # canonical_size: morph in an aligned NxN face space (e.g. 256) so cost doesn't
+    # depend on camera resolution or target image size
+    # composite="hull": one face-hull mask per frame (feather > 0 softens its edge)
+    morph_engine = FaceMorpher(incremental=incremental, canonical_size=canonical_size, composite=composite,
+                               feather=feather)
+    # pre-scaled target levels so large target images aren't warped at full size
+    morph_engine.set_target(target_img, target_points)
 
     logger.info("Components Initialised")
     return tracker, target_img, target_points, morph_engine
@@ -47,7 +75,7 @@ def init_components(source_path):
 def morph_live_frame(frame, target_img, target_points, morph_engine, alpha):
     try:
         # leave frame in BGR; FaceUtils.get_landmarks expects BGR and will convert internally
-        src_points = faceutils.get_landmarks(frame)
+        src_points = get_faceutils().get_landmarks(frame)
         if src_points is None or len(src_points)==0:
             return frame
         
@@ -68,56 +96,127 @@ def morph_live_frame(frame, target_img, target_points, morph_engine, alpha):
     
 
 
-def run_live_morph(tracker, target_img, target_points, morph_engine, virt_cam_devices="/dev/video10", fps=30):
+def run_live_morph(tracker, target_img, target_points, morph_engine, virt_cam_devices="/dev/video10", fps=30,
+                   sinks=None, max_frames=None, stop_event=None, on_frame=None, profiler=None):
+    """Morph frames from the tracker's source into the given sinks until ESC, source end,
+    max_frames or stop_event is set.
+
+    By default output goes to the virtual camera plus a small keyboard window.
+    Realtime sinks are paced on their own thread; the others are fed directly,
+    so e.g. [NullSink()] measures raw engine throughput. on_frame(frame_count)
+    is called after every frame. A SamplingProfiler passed as `profiler`
+    snapshots the engine stats (per-stage timings) with every profile it
+    captures. Returns run stats.
+    """
     frame = tracker.read()
     if frame is None:
         raise RuntimeError("Could not read Initial frame")
     
     height, width = frame.shape[:2]
 
+    # the presence gate keeps an idle camera from running FaceMesh on every empty frame
+    engine = LiveEngine(target_img, target_points, morph_engine, get_faceutils(), alpha=0.5, start_time=_start_time,
+                        presence_gate=True)
+    if profiler is not None and profiler.snapshot is None:
+        profiler.snapshot = engine.get_stats
+
+    if sinks is None:
+        sinks = [VirtualCamSink(virt_cam_devices), PreviewSink('Press ESC to exit', show_frames=False)]
+
+    opened = []
+    pacers = []
+    direct_sinks = []
+    frame_count = 0
+    start = time.perf_counter()
     try:
-        # Create a small window to capture keyboard events
-        cv2.namedWindow('Press ESC to exit', cv2.WINDOW_NORMAL)
-        cv2.resizeWindow('Press ESC to exit', 400, 100)
-        
-        with pyvirtualcam.Camera(width = width, height = height, fps = fps, device = virt_cam_devices) as cam:
-            alpha = 0.5
-            while True:
+        # build and warm the models at the stream resolution before any output starts;
+        # inside the try so a failed warm-up still releases the tracker
+        engine.warm_up(width, height)
+
+        for sink in sinks:
+            sink.open(width, height, fps)
+            opened.append(sink)
+            if sink.realtime:
+                # paced sinks get frames at a steady rate on their own thread,
+                # so the morph loop never waits on output timing
+                pacer = OutputPacer(sink, fps)
+                pacer.start()
+                pacers.append(pacer)
+            else:
+                direct_sinks.append(sink)
+
+        start = time.perf_counter()
+        while (max_frames is None or frame_count < max_frames) and not (stop_event and stop_event.is_set()):
+            # the frame used to size the sinks is morphed first
+            if frame_count > 0:
+                t0 = time.perf_counter()
                 frame = tracker.read()
-                if frame is None:
-                    continue
-
-                # worker = threading.Thread(target=task, args=(cam, frame, target_img, target_points, morph_engine, alpha), daemon=True)
-                # worker.start()
-
-                morphed_frame = morph_live_frame(frame, target_img, target_points, morph_engine, alpha)
-
-                # pyvirtualcam expects RGB frames by default; convert from BGR
-                try:
-                    send_frame = cv2.cvtColor(morphed_frame, cv2.COLOR_BGR2RGB)
-                except Exception:
-                    send_frame = morphed_frame
-
-                # log before sending the frame
-                try:
-                    logger.debug(f"Sending frame to virtual camera, shape={getattr(send_frame, 'shape', None)}")
-                    cam.send(send_frame)
-                    logger.debug("Frame sent to virtual camera")
-                except Exception as e:
-                    logger.error(f"Failed to send frame to virtual camera: {e}")
-
-                # Check for ESC key (must have a window open for this to work)
-                if cv2.waitKey(1) & 0xFF == 27:
-                    logger.info("ESC pressed, exiting...")
+                engine.timings.add("capture", time.perf_counter() - t0)
+            if frame is None:
+                if tracker.exhausted:
+                    logger.info("Source exhausted, exiting...")
+                    break
+                if tracker.stopped:
+                    logger.error("Capture stopped (camera lost or capture error), exiting...")
                     break
-                    
-                cam.sleep_until_next_frame()
+                continue
+            frame_count += 1
+
+            morphed_frame = engine.process(frame)
+
+            t0 = time.perf_counter()
+            for pacer in pacers:
+                pacer.submit(morphed_frame)
+            for sink in direct_sinks:
+                sink.send(morphed_frame)
+            engine.timings.add("output", time.perf_counter() - t0)
+
+            if any(pacer.failed for pacer in pacers):
+                logger.error("Virtual camera output failed, exiting...")
+                break
+            if any(sink.closed for sink in direct_sinks):
+                logger.info("Output closed (ESC pressed), exiting...")
+                break
+
+            if on_frame is not None:
+                on_frame(frame_count)
+
+            if frame_count % 300 == 0:
+                if morph_engine.incremental:
+                    stats = morph_engine.get_cache_stats()
+                    logger.info(f"Incremental morph: hit ratio={stats['hit_ratio']:.2f} "
+                                f"(hits={stats['hits']} misses={stats['misses']})")
+                gate_stats = engine.get_stats()["presence"]
+                if gate_stats is not None:
+                    logger.info(f"Presence gate: skipped={gate_stats['skipped']}/{gate_stats['frames']} "
+                                f"detector_runs={gate_stats['detector_runs']}")
+                cap_stats = tracker.get_capture_stats()
+                logger.info(f"Capture: captured={cap_stats['captured']} dropped={cap_stats['dropped']}")
+                for pacer in pacers:
+                    out_stats = pacer.get_stats()
+                    logger.info(f"Output: sent={out_stats['sent']} duplicated={out_stats['duplicated']} "
+                                f"skipped={out_stats['skipped']}")
 
     except Exception as e:
-        logger.error(f"Virtual cam error: {e}")
+        logger.error(f"Live morph error: {e}")
 
     finally:
-        cv2.destroyAllWindows()
+        for pacer in pacers:
+            pacer.stop()
+        for sink in opened:
+            sink.close()
+        tracker.release()
+
+    elapsed = time.perf_counter() - start
+    run_stats = {
+        "frames": frame_count,
+        "elapsed": elapsed,
+        "fps": frame_count / elapsed if elapsed > 0 else 0.0,
+        "output": [pacer.get_stats() for pacer in pacers],
+        "engine": engine.get_stats(),
+    }
+    logger.info(f"Live morph finished: {frame_count} frames in {elapsed:.2f}s ({run_stats['fps']:.1f} fps)")
+    return run_stats
 
 
 
@@ -142,13 +241,25 @@ def task(cam, frame, target_img, target_points, morph_engine, alpha):
 
 
 
-def main(source_path=None):
+def main(source_path=None, preview_shm=None):
     try:
         if source_path is None:
             raise ValueError("Source image path not provided")
             
         tracker, target_img, target_points, morph_engine = init_components(source_path)
-        run_live_morph(tracker, target_img, target_points, morph_engine)
+
+        # profile a running session in place: `kill -USR1 <pid>` or `touch morph_profiles/trigger`
+        profiler = SamplingProfiler()
+        profiler.install_signal()
+        profiler.watch()
+        try:
+            sinks = None
+            if preview_shm is not None:
+                # preview is drawn by the control panel from shared memory; no window in this process
+                sinks = [VirtualCamSink(), SharedMemorySink(preview_shm)]
+            run_live_morph(tracker, target_img, target_points, morph_engine, sinks=sinks, profiler=profiler)
+        finally:
+            profiler.close(timeout=0)
 
     except Exception as e:
         print(e)
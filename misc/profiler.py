@@ -0,0 +1,186 @@
+import collections
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger('profiler')
+
+
+class SamplingProfiler():
+    """On-demand, time-boxed sampling profiler for a running process.
+
+    trigger() starts a background thread that samples the stacks of all
+    threads (sys._current_frames) every `interval` seconds for `duration`
+    seconds, then writes to out_dir:
+
+      <stamp>_stacks.txt   collapsed stacks ("thread;frame;frame count"),
+                           loadable by flamegraph.pl / speedscope
+      <stamp>_summary.json top functions, per-thread sample counts and the
+                           `snapshot()` stats taken before and after
+
+    Nothing runs on the profiled threads, so the stream keeps going. A
+    profile can be triggered by install_signal() (SIGUSR1 by default), by
+    touching the control file started with watch(), or by calling trigger().
+    """
+
+    def __init__(self, out_dir="morph_profiles", interval=0.005, duration=10.0, snapshot=None):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.duration = duration
+        # callable returning a JSON-able dict (e.g. LiveEngine.get_stats with per-stage timings)
+        self.snapshot = snapshot
+
+        self._thread = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self.last_output = None
+        self.profiles_written = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self, duration=None):
+        """Start a profile unless one is running; returns True if started. Safe to call from a signal handler."""
+        with self._lock:
+            if self.running:
+                logger.info("SamplingProfiler: already running, trigger ignored")
+                return False
+            self._thread = threading.Thread(target=self._run, args=(duration or self.duration,),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def install_signal(self, signum=None):
+        """Trigger a profile on a signal (SIGUSR1 by default); must be called from the main thread."""
+        signum = signum or getattr(signal, "SIGUSR1", None)
+        if signum is None:
+            logger.warning("SamplingProfiler: no SIGUSR1 on this platform, signal trigger disabled")
+            return False
+        signal.signal(signum, lambda *_: self.trigger())
+        logger.info(f"SamplingProfiler: send signal {int(signum)} to pid {os.getpid()} to capture a profile")
+        return True
+
+    def watch(self, control_path=None, poll=1.0):
+        """Trigger a profile whenever control_path is created or touched. The file may hold a duration in seconds."""
+        control_path = control_path or os.path.join(self.out_dir, "trigger")
+        os.makedirs(os.path.dirname(control_path) or ".", exist_ok=True)
+        self._stop_watching.clear()
+
+        def loop():
+            last = os.path.getmtime(control_path) if os.path.exists(control_path) else None
+            while not self._stop_watching.wait(poll):
+                try:
+                    mtime = os.path.getmtime(control_path)
+                except OSError:
+                    continue
+                if mtime != last:
+                    last = mtime
+                    self.trigger(self._read_duration(control_path))
+
+        self._watcher = threading.Thread(target=loop, name="profiler-watch", daemon=True)
+        self._watcher.start()
+        logger.info(f"SamplingProfiler: touch {control_path} to capture a profile")
+
+    @staticmethod
+    def _read_duration(path):
+        try:
+            with open(path) as f:
+                text = f.read().strip()
+            return float(text) if text else None
+        except (OSError, ValueError):
+            return None
+
+    def close(self, timeout=None):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=2.0)
+            self._watcher = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _take_snapshot(self):
+        if self.snapshot is None:
+            return None
+        try:
+            return self.snapshot()
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def _run(self, duration):
+        me = threading.get_ident()
+        names = {}
+        stacks = collections.Counter()
+        samples = 0
+        before = self._take_snapshot()
+        logger.info(f"SamplingProfiler: sampling all threads for {duration:.1f}s")
+
+        start = time.monotonic()
+        next_sample = start
+        while True:
+            now = time.monotonic()
+            if now - start >= duration:
+                break
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks[(ident, tuple(reversed(stack)))] += 1
+            samples += 1
+            next_sample += self.interval
+            time.sleep(max(next_sample - time.monotonic(), 0))
+
+        elapsed = time.monotonic() - start
+        self._write(stacks, names, samples, elapsed, before, self._take_snapshot())
+
+    def _write(self, stacks, names, samples, elapsed, before, after):
+        os.makedirs(self.out_dir, exist_ok=True)
+        # milliseconds plus the profile count, so two profiles in the same second never collide
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        base = os.path.join(self.out_dir, f"{stamp}-{self.profiles_written:03d}")
+
+        per_thread = collections.Counter()
+        leaf = collections.Counter()
+        inclusive = collections.Counter()
+        with open(base + "_stacks.txt", "w") as f:
+            for (ident, stack), count in stacks.most_common():
+                thread = names.get(ident, str(ident))
+                f.write(";".join((thread,) + stack) + f" {count}\n")
+                per_thread[thread] += count
+                if stack:
+                    leaf[stack[-1]] += count
+                for func in set(stack):
+                    inclusive[func] += count
+
+        # shares are of all thread-samples, so they add up to 1 across threads
+        total = max(sum(per_thread.values()), 1)
+        summary = {
+            "pid": os.getpid(),
+            "duration": elapsed,
+            "interval": self.interval,
+            "samples": samples,
+            "threads": dict(per_thread),
+            "top_self": [{"frame": k, "samples": v, "share": v / total} for k, v in leaf.most_common(30)],
+            "top_inclusive": [{"frame": k, "samples": v, "share": v / total}
+                              for k, v in inclusive.most_common(30)],
+            "stats_before": before,
+            "stats_after": after,
+        }
+        with open(base + "_summary.json", "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+        self.last_output = base
+        self.profiles_written += 1
+        logger.info(f"SamplingProfiler: {samples} samples written to {base}_stacks.txt / _summary.json")
@@ -0,0 +1,154 @@
+import collections
+import json
+import os
+import queue
+import threading
+import time
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('diagnostics')
+
+
+class DiagnosticsRecorder():
+    """Keep recent per-frame landmarks in memory and snapshot failures to disk off the frame loop.
+
+    record() and report_failure() only copy data and enqueue it; drawing and
+    writing happen on a background thread. Snapshots are rate limited to one
+    per min_interval seconds and stop once max_bytes have been written.
+    """
+
+    def __init__(self, out_dir=None, history=60, min_interval=5.0, max_bytes=50 * 1024 * 1024, queue_size=2):
+        self.out_dir = out_dir or os.path.join(os.getcwd(), "morph_debug")
+        self.history = collections.deque(maxlen=history)
+        self.min_interval = min_interval
+        self.max_bytes = max_bytes
+
+        self.frame_index = 0
+        self.failures = 0
+        self.snapshots_written = 0
+        self.snapshots_skipped = 0
+        self.bytes_written = 0
+
+        self._last_snapshot = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, src_points, **meta):
+        """Remember this frame's landmarks and metadata in the ring buffer."""
+        self.frame_index += 1
+        self.history.append({
+            "frame": self.frame_index,
+            "time": time.time(),
+            "src_points": np.array(src_points, dtype=np.float32),
+            "meta": meta,
+        })
+
+    def report_failure(self, reason, src_img, dst_img, src_points, dst_points, interp_points):
+        """Queue a snapshot of a failing frame; returns False if it was rate limited or dropped."""
+        self.failures += 1
+        now = time.monotonic()
+        if self._last_snapshot is not None and now - self._last_snapshot < self.min_interval:
+            self.snapshots_skipped += 1
+            return False
+        if self.bytes_written >= self.max_bytes:
+            self.snapshots_skipped += 1
+            return False
+
+        snapshot = {
+            "reason": reason,
+            "frame": self.frame_index,
+            "time": time.time(),
+            "src_img": src_img.copy(),
+            "dst_img": dst_img,
+            "src_points": np.array(src_points, dtype=np.float32),
+            "dst_points": np.array(dst_points, dtype=np.float32),
+            "interp_points": np.array(interp_points, dtype=np.float32),
+            "history": list(self.history),
+        }
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            self.snapshots_skipped += 1
+            return False
+
+        self._last_snapshot = now
+        self._ensure_thread()
+        return True
+
+    def get_stats(self):
+        return {
+            "failures": self.failures,
+            "written": self.snapshots_written,
+            "skipped": self.snapshots_skipped,
+            "bytes": self.bytes_written,
+        }
+
+    def close(self, timeout=5.0):
+        """Flush pending snapshots and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=timeout)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._writer, name="DiagnosticsRecorder", daemon=True)
+                self._thread.start()
+
+    def _writer(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                break
+            try:
+                self._write_snapshot(snapshot)
+            except Exception as e:
+                logger.warning(f"_writer: failed writing diagnostics snapshot: {e}")
+
+    def _write_snapshot(self, snapshot):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(snapshot["time"]))
+        snap_dir = os.path.join(self.out_dir, f"{stamp}_frame{snapshot['frame']:06d}")
+        os.makedirs(snap_dir, exist_ok=True)
+
+        images = {
+            "debug_src_landmarks.png": (snapshot["src_img"].copy(), snapshot["src_points"]),
+            "debug_dst_landmarks.png": (snapshot["dst_img"].copy(), snapshot["dst_points"]),
+            "debug_interpolated.png": (snapshot["src_img"], snapshot["interp_points"]),
+        }
+        written = 0
+        for name, (vis, points) in images.items():
+            for (x, y) in points:
+                cv2.circle(vis, (int(x), int(y)), 1, (0, 255, 0), -1)
+            path = os.path.join(snap_dir, name)
+            cv2.imwrite(path, vis)
+            written += os.path.getsize(path)
+
+        meta = {
+            "reason": snapshot["reason"],
+            "frame": snapshot["frame"],
+            "time": snapshot["time"],
+            "history": [
+                {
+                    "frame": entry["frame"],
+                    "time": entry["time"],
+                    "src_points": entry["src_points"].tolist(),
+                    "meta": entry["meta"],
+                }
+                for entry in snapshot["history"]
+            ],
+        }
+        path = os.path.join(snap_dir, "history.json")
+        with open(path, "w") as f:
+            json.dump(meta, f, default=str)
+        written += os.path.getsize(path)
+
+        self.bytes_written += written
+        self.snapshots_written += 1
+        logger.info(f"Wrote diagnostics snapshot to {snap_dir} ({written} bytes)")
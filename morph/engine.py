@@ -0,0 +1,183 @@
+import collections
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from morph.utils import FaceUtils
+from morph.morph_core import FaceMorpher
+from morph.presence import PresenceGate
+
+logger = logging.getLogger('engine')
+
+
+class StageTimings():
+    """Running per-stage durations: totals plus a window of recent samples for avg / p95."""
+
+    def __init__(self, window=300):
+        self.window = window
+        self._stages = {}
+
+    def add(self, stage, seconds):
+        entry = self._stages.get(stage)
+        if entry is None:
+            entry = self._stages[stage] = {"count": 0, "total": 0.0, "max": 0.0,
+                                           "recent": collections.deque(maxlen=self.window)}
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["recent"].append(seconds)
+
+    def snapshot(self):
+        result = {}
+        for stage, entry in list(self._stages.items()):
+            recent = np.array(list(entry["recent"]))
+            result[stage] = {
+                "count": entry["count"],
+                "avg_ms": 1000.0 * entry["total"] / max(entry["count"], 1),
+                "recent_avg_ms": 1000.0 * float(recent.mean()) if recent.size else 0.0,
+                "recent_p95_ms": 1000.0 * float(np.percentile(recent, 95)) if recent.size else 0.0,
+                "max_ms": 1000.0 * entry["max"],
+            }
+        return result
+
+
+class LiveEngine():
+    """Landmark + morph stage of the live loop with an explicit startup phase.
+
+    Models are built lazily on first use; warm_up() builds them and pushes
+    synthetic frames at the stream resolution through FaceMesh and the warp
+    path so the first real frames don't pay graph initialization / allocation
+    costs. Startup metrics are measured from `start_time` (defaults to
+    engine creation) to the first frame that was actually morphed.
+
+    presence_gate (True for a default PresenceGate) skips landmarking and
+    morphing while nobody is in front of the camera. Per-stage durations
+    are kept in `timings` (the live loop adds capture/output there too).
+    """
+
+    def __init__(self, target_img, target_points, morph_engine=None, faceutils=None, alpha=0.5, start_time=None,
+                 presence_gate=None):
+        self.target_img = target_img
+        self.target_points = target_points
+        self.alpha = alpha
+        self._morph_engine = morph_engine
+        self._faceutils = faceutils
+        if presence_gate is True:
+            presence_gate = PresenceGate()
+        self.presence_gate = presence_gate
+
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.warmup_time = None
+        self.time_to_first_frame = None
+        self.time_to_first_morphed_frame = None
+        self.frames = 0
+        self.morphed_frames = 0
+        self.timings = StageTimings()
+
+    @property
+    def faceutils(self):
+        if self._faceutils is None:
+            self._faceutils = FaceUtils(landmark_filter=True)
+        return self._faceutils
+
+    @property
+    def morph_engine(self):
+        if self._morph_engine is None:
+            self._morph_engine = FaceMorpher(incremental=True)
+        return self._morph_engine
+
+    def warm_up(self, width, height, iterations=2):
+        """Build the models and run synthetic frames of width x height through them."""
+        t0 = time.perf_counter()
+        faceutils = self.faceutils
+        morph_engine = self.morph_engine
+
+        frame = self._synthetic_frame(width, height)
+        for _ in range(iterations):
+            points = faceutils.get_landmarks(frame, smooth=False)
+            if len(points) != len(self.target_points):
+                # no face found in the synthetic frame: still exercise the warp path
+                points = self._synthetic_points(width, height)
+            morph_engine.get_morphed_face(frame, self.target_img, points, self.target_points, self.alpha)
+
+        # don't let warm-up state leak into the stream
+        if faceutils.landmark_filter is not None:
+            faceutils.landmark_filter.reset()
+        morph_engine.reset_cache()
+        if self.presence_gate is not None:
+            self.presence_gate.detect(frame)
+            self.presence_gate.reset()
+
+        self.warmup_time = time.perf_counter() - t0
+        logger.info(f"warm_up: models ready in {self.warmup_time * 1000:.0f} ms at {width}x{height}")
+        return self.warmup_time
+
+    def _face_box(self, width, height):
+        # centre the target face at roughly the size it takes up in a typical call
+        size = min(width, height) * 0.5
+        pts = np.asarray(self.target_points, dtype=np.float32)
+        lo, hi = pts.min(axis=0), pts.max(axis=0)
+        scale = size / max(float((hi - lo).max()), 1.0)
+        offset = np.array([width, height], dtype=np.float32) / 2 - scale * (lo + hi) / 2
+        return scale, offset
+
+    def _synthetic_frame(self, width, height):
+        scale, offset = self._face_box(width, height)
+        mat = np.array([[scale, 0, offset[0]], [0, scale, offset[1]]], dtype=np.float32)
+        return cv2.warpAffine(self.target_img, mat, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+    def _synthetic_points(self, width, height):
+        scale, offset = self._face_box(width, height)
+        return np.asarray(self.target_points, dtype=np.float32) * scale + offset
+
+    def process(self, frame, timestamp=None):
+        """Return the morphed frame (or the input frame when no usable face was found)."""
+        morphed = False
+        output = frame
+        t0 = time.perf_counter()
+        try:
+            if self.presence_gate is not None and not self.presence_gate.should_process(frame):
+                src_points = []
+                self.timings.add("presence", time.perf_counter() - t0)
+            else:
+                src_points = self.faceutils.get_landmarks(frame, timestamp)
+                if self.presence_gate is not None:
+                    self.presence_gate.update(len(src_points) > 0)
+                self.timings.add("landmarks", time.perf_counter() - t0)
+            if src_points is not None and len(src_points) == len(self.target_points):
+                t1 = time.perf_counter()
+                output = self.morph_engine.get_morphed_face(frame, self.target_img, src_points,
+                                                            self.target_points, self.alpha)
+                self.timings.add("morph", time.perf_counter() - t1)
+                morphed = True
+            elif len(src_points) > 0:
+                logger.warning(f"Landmark count mismatch: src={len(src_points)} target={len(self.target_points)}")
+        except Exception as e:
+            logger.error(f"process: morphing failed: {e}")
+            output = frame
+
+        self.frames += 1
+        now = time.perf_counter()
+        self.timings.add("process", now - t0)
+        if self.time_to_first_frame is None:
+            self.time_to_first_frame = now - self.start_time
+            logger.info(f"process: time to first frame {self.time_to_first_frame * 1000:.0f} ms")
+        if morphed:
+            self.morphed_frames += 1
+            if self.time_to_first_morphed_frame is None:
+                self.time_to_first_morphed_frame = now - self.start_time
+                logger.info(f"process: time to first morphed frame {self.time_to_first_morphed_frame * 1000:.0f} ms")
+        return output
+
+    def get_stats(self):
+        return {
+            "frames": self.frames,
+            "morphed_frames": self.morphed_frames,
+            "warmup_time": self.warmup_time,
+            "time_to_first_frame": self.time_to_first_frame,
+            "time_to_first_morphed_frame": self.time_to_first_morphed_frame,
+            "presence": self.presence_gate.get_stats() if self.presence_gate is not None else None,
+            "stages": self.timings.snapshot(),
+        }
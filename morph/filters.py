@@ -0,0 +1,73 @@
+import math
+import time
+
+import numpy as np
+
+
+class OneEuroFilter():
+    """Vectorized One-Euro filter over a whole (N, 2) landmark array.
+
+    Each landmark gets its own adaptive cutoff: still points are smoothed
+    heavily (min_cutoff), fast moving ones follow closely (beta). The filter
+    resets itself when the landmark count changes or the face jumps by more
+    than jump_threshold times its size between two frames.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0, jump_threshold=0.3):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.jump_threshold = jump_threshold
+        self.resets = 0
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+        self.face_size = 1.0
+
+    @staticmethod
+    def _smoothing(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, points, timestamp=None):
+        x = np.asarray(points, dtype=np.float32)
+        t = time.monotonic() if timestamp is None else timestamp
+
+        if self.x_prev is None or x.shape != self.x_prev.shape:
+            return self._start(x, t)
+
+        # a large jump means a different face / lost track: don't smear across it
+        step = x - self.x_prev
+        displacement = float(np.hypot(step[:, 0], step[:, 1]).mean())
+        if displacement > self.jump_threshold * self.face_size:
+            self.resets += 1
+            return self._start(x, t)
+
+        dt = t - self.t_prev
+        if dt <= 0:
+            dt = 1.0 / 30
+
+        a_d = self._smoothing(self.d_cutoff, dt)
+        dx_hat = (a_d / dt) * step + (1 - a_d) * self.dx_prev
+
+        speed = np.hypot(dx_hat[:, 0], dx_hat[:, 1])
+        # per-landmark smoothing factor: a = 1 / (1 + tau / dt), tau = 1 / (2 pi cutoff)
+        cutoff = self.min_cutoff + self.beta * speed
+        a = (1.0 / (1.0 + 1.0 / (2 * np.pi * dt * cutoff)))[:, None]
+        x_hat = self.x_prev + a * step
+
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = t
+        return self.x_prev.copy()
+
+    def _start(self, x, t):
+        self.x_prev = x.copy()
+        self.dx_prev = np.zeros_like(x)
+        self.t_prev = t
+        # face size measured once per track; only used for jump detection
+        self.face_size = max(float((x.max(axis=0) - x.min(axis=0)).max()), 1.0)
+        return x.copy()
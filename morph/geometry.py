@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def bounding_rects(tris):
+    """cv2.boundingRect for every triangle of a (T,3,2) float array, as a (T,4) int array of x, y, w, h."""
+    lo = np.floor(tris.min(axis=1)).astype(np.int32)
+    hi = np.floor(tris.max(axis=1)).astype(np.int32)
+    return np.concatenate([lo, hi - lo + 1], axis=1)
+
+
+def affine_matrices(src, dst):
+    """cv2.getAffineTransform for every triangle pair of two (T,3,2) arrays, as (T,2,3) float64.
+
+    Degenerate (collinear) source triangles get an all-zero matrix, as OpenCV returns.
+    """
+    T = len(src)
+    A = np.ones((T, 3, 3), dtype=np.float64)
+    A[:, :, :2] = src
+    det = np.linalg.det(A)
+    ok = np.abs(det) > 1e-9
+    A[~ok] = np.eye(3)
+
+    mats = np.linalg.solve(A, dst.astype(np.float64)).transpose(0, 2, 1)
+    mats[~ok] = 0.0
+    return mats
+
+
+class TriangleGeometry():
+    """Bounding rects, rect-relative triangles and affine matrices for all triangles at once.
+
+    The source and target parts depend only on the landmarks, so an alpha
+    sweep over the same pair computes them once and calls for_alpha() (or
+    for_points()) per frame, which only redoes the interpolated half.
+
+    Arrays are indexed by triangle: `*_tris` / `*_offsets` are (T,3,2)
+    float32, `*_rects` (T,4) int32, `src_mats` / `dst_mats` (T,2,3) map the
+    source / target crop onto the interpolated rect.
+    """
+
+    def __init__(self, triangles, src_points, dst_points, interp_points=None):
+        self.triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        self.src_points = np.asarray(src_points, dtype=np.float32)
+        self.dst_points = np.asarray(dst_points, dtype=np.float32)
+
+        self.src_tris = self.src_points[self.triangles]
+        self.dst_tris = self.dst_points[self.triangles]
+        self.src_rects = bounding_rects(self.src_tris)
+        self.dst_rects = bounding_rects(self.dst_tris)
+        self.src_offsets = self.src_tris - self.src_rects[:, None, :2]
+        self.dst_offsets = self.dst_tris - self.dst_rects[:, None, :2]
+
+        self.interp_tris = None
+        self.interp_rects = None
+        self.interp_offsets = None
+        self.src_mats = None
+        self.dst_mats = None
+        if interp_points is not None:
+            self._set_interp(interp_points)
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def _set_interp(self, interp_points):
+        self.interp_tris = np.asarray(interp_points, dtype=np.float32)[self.triangles]
+        self.interp_rects = bounding_rects(self.interp_tris)
+        self.interp_offsets = self.interp_tris - self.interp_rects[:, None, :2]
+        self.src_mats = affine_matrices(self.src_offsets, self.interp_offsets)
+        self.dst_mats = affine_matrices(self.dst_offsets, self.interp_offsets)
+
+    def for_points(self, interp_points):
+        """A copy sharing this geometry's source/target part, with the interpolated part for interp_points."""
+        geometry = object.__new__(TriangleGeometry)
+        geometry.__dict__.update(self.__dict__)
+        geometry._set_interp(interp_points)
+        return geometry
+
+    def for_alpha(self, alpha):
+        return self.for_points((1 - alpha) * self.src_points + alpha * self.dst_points)
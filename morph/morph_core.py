@@ -2,16 +2,74 @@ import numpy as np
 import cv2
 from morph.triangles import Triangulator
 from morph.utils import FaceUtils
+from morph.pyramid import TargetPyramid, face_extent
+from morph.diagnostics import DiagnosticsRecorder
+from morph.geometry import TriangleGeometry
 import logging
 
 logger = logging.getLogger('morph_core')
 
 
 class FaceMorpher:
-    def __init__(self):
+    def __init__(self, incremental=False, move_threshold=0.5, pixel_threshold=2.0, canonical_size=None,
+                 composite="triangles", feather=0.0):
         self.utils = FaceUtils
         self.triangulator = Triangulator
 
+        # incremental mode: reuse last frame's warped patches for triangles whose
+        # vertices moved less than move_threshold px and whose source pixels
+        # changed less than pixel_threshold (mean abs diff per channel)
+        self.incremental = incremental
+        self.move_threshold = move_threshold
+        self.pixel_threshold = pixel_threshold
+        # cache entries are keyed by a target token rather than id(target): the image is held
+        # so its id can't be reused, and set_target() bumps the token
+        self._cache_target = None
+        self._target_token = 0
+        self.reset_cache()
+
+        # canonical mode: align both faces to a canonical_size x canonical_size square,
+        # morph there and warp the result back, so cost doesn't depend on frame/target size
+        self.canonical_size = canonical_size
+        self._canonical_target = None
+
+        # composite="hull": build the morphed face in one ROI buffer (each pixel written by exactly
+        # one triangle) and blend it into the frame through a single convex-hull mask, optionally
+        # feathered by a Gaussian blur of `feather` px; "triangles" blends every patch separately
+        if composite not in ("triangles", "hull"):
+            raise ValueError(f"unknown composite mode: {composite}")
+        self.composite = composite
+        self.feather = feather
+
+        # ring buffer of recent landmarks + rate-limited failure snapshots
+        self.diagnostics = DiagnosticsRecorder()
+
+        # optional pre-scaled target, see set_target()
+        self.target_pyramid = None
+        self._pyramid_level = None
+
+    def set_target(self, img, points, min_face_size=64, pyramid=None):
+        """Precompute a target pyramid; get_morphed_face then warps from the level
+        whose face size is closest to the face currently on screen.
+        An existing (read-only) TargetPyramid for the same target can be shared via `pyramid`."""
+        self.target_pyramid = pyramid if pyramid is not None else TargetPyramid(img, points, min_face_size)
+        self._pyramid_level = None
+        self._target_token += 1
+
+    def reset_cache(self):
+        """Drop all cached triangles / patches used by incremental mode."""
+        self._tri_cache = {}
+        self._cache_key = None
+        self._cached_points = None
+        self._cached_triangles = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def get_cache_stats(self):
+        total = self.cache_hits + self.cache_misses
+        hit_ratio = self.cache_hits / total if total else 0.0
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "hit_ratio": hit_ratio}
+
     
     def warp_triangle(self, img, t_in, t_out):
         t_in = np.array(t_in, dtype=np.float32)
@@ -44,14 +102,18 @@ class FaceMorpher:
         return warped_patch, mask, r_out
     
 
-    def morph_triangle(self, img1, img2, img_morph, t1, t2, t, alpha):
+    def blend_triangle(self, img1, img2, t1, t2, t, alpha, dtype=np.uint8):
+        """Warp both triangles into t and blend them; returns (patch, mask, rect)."""
         warp1, mask1, r1 = self.warp_triangle(img1, t1, t)
         warp2, mask2, r2 = self.warp_triangle(img2, t2, t)
 
         blended_patch = cv2.addWeighted(warp1, 1-alpha, warp2, alpha, 0)
-        blended_patch = blended_patch.astype(img_morph.dtype)
-        logger.debug(f"morph_triangle: blended_patch.shape={getattr(blended_patch,'shape',None)} r1={r1}")
-        
+        blended_patch = blended_patch.astype(dtype)
+        logger.debug(f"blend_triangle: blended_patch.shape={getattr(blended_patch,'shape',None)} r1={r1}")
+        return blended_patch, mask1, r1
+
+
+    def composite_patch(self, img_morph, blended_patch, mask1, r1):
         x,y,w,h = r1
         x = max(x, 0)
         y = max(y, 0)
@@ -62,60 +124,280 @@ class FaceMorpher:
         img_morph[y:y+h, x:x+w] = roi * (1-mask_out/255.0) + blended_patch * (mask_out/255.0)
 
 
+    def morph_triangle(self, img1, img2, img_morph, t1, t2, t, alpha):
+        blended_patch, mask1, r1 = self.blend_triangle(img1, img2, t1, t2, t, alpha, img_morph.dtype)
+        self.composite_patch(img_morph, blended_patch, mask1, r1)
+
+
+    def get_geometry(self, triangles, src_points, dst_points, interp_points=None):
+        """Rects, offsets and affine matrices of all triangles in one vectorized pass.
+        The result can be reused, e.g. geometry.for_alpha(a) for an alpha sweep."""
+        return TriangleGeometry(triangles, src_points, dst_points, interp_points)
+
+
+    def warp_rect(self, img, rect_in, mat, rect_out):
+        """Pixel half of warp_triangle: warp the rect_in crop of img onto rect_out with a precomputed matrix."""
+        x, y, w, h = rect_in
+        return cv2.warpAffine(img[y:y+h, x:x+w], mat, (int(rect_out[2]), int(rect_out[3])),
+                              flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT_101)
+
+
+    def blend_geometry(self, img1, img2, geometry, i, alpha, dtype=np.uint8, with_mask=True):
+        """blend_triangle for triangle i of a TriangleGeometry; returns (patch, mask, rect).
+        The mask is None with with_mask=False (hull compositing doesn't need it)."""
+        r = tuple(geometry.interp_rects[i].tolist())
+        mask = None
+        if with_mask:
+            mask = np.zeros((r[3], r[2]), dtype=np.uint8)
+            cv2.fillConvexPoly(mask, np.int32(geometry.interp_offsets[i]), 255)
+
+        warp1 = self.warp_rect(img1, geometry.src_rects[i], geometry.src_mats[i], r)
+        warp2 = self.warp_rect(img2, geometry.dst_rects[i], geometry.dst_mats[i], r)
+        blended_patch = cv2.addWeighted(warp1, 1-alpha, warp2, alpha, 0).astype(dtype)
+        return blended_patch, mask, r
+
+
+    def _morph_triangle_cached(self, img1, img2, tri_indices, geometry, i, alpha, dtype=np.uint8, img_morph=None):
+        """Incremental blend_geometry for triangle i; returns (patch, mask, rect).
+
+        With img_morph (triangles compositing) the patch is composited here and
+        the composited pixels are cached too, so a hit is one masked copy into
+        img_morph; patch and mask are None then, there is nothing left to do.
+        """
+        t1 = geometry.src_tris[i]
+        t = geometry.interp_tris[i]
+
+        x, y, w, h = geometry.src_rects[i]
+        src_crop = img1[y:y+h, x:x+w]
+
+        entry = self._tri_cache.get(tri_indices)
+        if entry is not None:
+            c_t1, c_t, c_crop, c_patch, c_mask, c_rect, c_composited, c_where = entry
+            moved = max(np.abs(t1 - c_t1).max(), np.abs(t - c_t).max())
+            if moved <= self.move_threshold and c_crop.shape == src_crop.shape and src_crop.size:
+                diff = cv2.norm(src_crop, c_crop, cv2.NORM_L1) / src_crop.size
+                if diff <= self.pixel_threshold:
+                    self.cache_hits += 1
+                    if img_morph is None:
+                        return c_patch, c_mask, c_rect
+                    if c_composited is None:
+                        self.composite_patch(img_morph, c_patch, c_mask, c_rect)
+                    else:
+                        x, y, w, h = c_rect
+                        np.copyto(img_morph[y:y+h, x:x+w], c_composited, where=c_where)
+                    return None, None, c_rect
+
+        self.cache_misses += 1
+        blended_patch, mask1, r1 = self.blend_geometry(img1, img2, geometry, i, alpha, dtype,
+                                                       with_mask=self.composite != "hull")
+        composited = where = None
+        if img_morph is not None:
+            self.composite_patch(img_morph, blended_patch, mask1, r1)
+            x, y, w, h = r1
+            if x >= 0 and y >= 0:
+                composited = img_morph[y:y+h, x:x+w].copy()
+                where = (mask1 > 0)[:composited.shape[0], :composited.shape[1]]
+                if composited.ndim == 3:
+                    where = where[..., None]
+                # the composited pixels replace the patch in the cache
+                blended_patch = mask1 = None
+        self._tri_cache[tri_indices] = (t1, t, src_crop.copy(), blended_patch, mask1, r1, composited, where)
+        if img_morph is not None:
+            return None, None, r1
+        return blended_patch, mask1, r1
+
+
+    def _face_roi(self, geometry, shape, pad=0):
+        # union of the interpolated triangle rects (plus pad), clipped to the frame
+        h, w = shape[:2]
+        rects = geometry.interp_rects
+        x0 = max(int(rects[:, 0].min()) - pad, 0)
+        y0 = max(int(rects[:, 1].min()) - pad, 0)
+        x1 = min(int((rects[:, 0] + rects[:, 2]).max()) + pad, w)
+        y1 = min(int((rects[:, 1] + rects[:, 3]).max()) + pad, h)
+        return x0, y0, x1, y1
+
+
+    def _place_patch(self, buf, labels, origin, patch, rect, label):
+        # copy the pixels of patch that belong to triangle `label` into buf
+        x, y = rect[0] - origin[0], rect[1] - origin[1]
+        bx0, by0 = max(x, 0), max(y, 0)
+        bx1, by1 = min(x + rect[2], buf.shape[1]), min(y + rect[3], buf.shape[0])
+        if bx1 <= bx0 or by1 <= by0:
+            return
+        where = labels[by0:by1, bx0:bx1] == label
+        np.copyto(buf[by0:by1, bx0:bx1], patch[by0 - y:by1 - y, bx0 - x:bx1 - x],
+                  where=where[..., None] if buf.ndim == 3 else where)
+
+
+    def _composite_hull(self, morphed_img, buf, roi, interp_points):
+        """Blend the ROI buffer into the frame through one (optionally feathered) face-hull mask."""
+        x0, y0, x1, y1 = roi
+        hull = cv2.convexHull(np.int32(interp_points)) - [x0, y0]
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillConvexPoly(mask, np.int32(hull), 255)
+
+        frame_roi = morphed_img[y0:y1, x0:x1]
+        if self.feather > 0:
+            mask = cv2.GaussianBlur(mask, (0, 0), self.feather)
+            weights = mask.astype(np.float32) / 255.0
+            cv2.blendLinear(buf, frame_roi, weights, 1.0 - weights, dst=frame_roi)
+        else:
+            np.copyto(frame_roi, buf, where=(mask > 0)[..., None] if buf.ndim == 3 else mask > 0)
+
+
+    def get_triangles(self, rect, points):
+        """Delaunay triangles (landmark index triples) of points within rect; doesn't touch the incremental cache."""
+        triangulater = self.triangulator(rect, points)
+        return triangulater.get_triangles(rect, points)
+
+
+    def _get_triangles(self, rect, points):
+        """Triangulate points; in incremental mode reuse the last topology while the face is still."""
+        if self.incremental and self._cached_triangles is not None and self._cached_points is not None \
+                and self._cached_points.shape == points.shape \
+                and np.abs(points - self._cached_points).max() <= self.move_threshold:
+            return self._cached_triangles
+
+        triangles = self.get_triangles(rect, points)
+        if self.incremental and len(triangles) > 0:
+            self._cached_points = points.copy()
+            self._cached_triangles = triangles
+        return triangles
+
+
     def get_morphed_face(self, src_img, dst_img, src_points, dst_points, alpha):
+        self.diagnostics.record(src_points, alpha=float(alpha), frame_shape=src_img.shape)
+
+        if self.target_pyramid is not None and self.target_pyramid.matches(dst_img):
+            if self.canonical_size:
+                # the face spans the canonical square minus its margins
+                face_size = self.canonical_size * 0.6
+            else:
+                face_size = face_extent(src_points)
+            level, level_img, level_points = self.target_pyramid.select(face_size)
+            if level != self._pyramid_level:
+                logger.info(f"get_morphed_face: using target pyramid level {level} for face size {face_size:.0f}px")
+                self._pyramid_level = level
+            if self.canonical_size:
+                # the canonical square absorbs the level's scale, so the level can stand in for the target
+                return self._morph_canonical(src_img, level_img, src_points, level_points, alpha)
+            # the level only supplies texture; the interpolated shape keeps the full-res target landmarks
+            # so the face doesn't jump when the level changes
+            return self._morph_frame(src_img, dst_img, src_points, dst_points, alpha,
+                                     texture=(level_img, level_points))
+
+        if self.canonical_size:
+            return self._morph_canonical(src_img, dst_img, src_points, dst_points, alpha)
+        return self._morph_frame(src_img, dst_img, src_points, dst_points, alpha)
+
+
+    def canonical_transform(self, points, size, margin=0.2):
+        """Similarity transform (2x3) that levels the eyes and fits the face into a size x size square."""
+        pts = np.asarray(points, dtype=np.float32)
+        angle = 0.0
+        # MediaPipe FaceMesh outer eye corners
+        if len(pts) > 263:
+            dx, dy = pts[263] - pts[33]
+            angle = np.degrees(np.arctan2(dy, dx))
+
+        center = tuple(map(float, pts.mean(axis=0)))
+        rot = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = pts @ rot[:, :2].T + rot[:, 2]
+        lo, hi = rotated.min(axis=0), rotated.max(axis=0)
+        extent = max(float((hi - lo).max()), 1.0)
+
+        scale = size * (1.0 - 2 * margin) / extent
+        mat = rot * scale
+        mat[:, 2] += size / 2.0 - scale * (lo + hi) / 2.0
+        return mat
+
+
+    def _get_canonical_target(self, dst_img, dst_points, size):
+        # the target is aligned once and reused until image, landmarks or size change; the
+        # image and landmarks are held and compared by identity, so a freed target's id can't match
+        cached = self._canonical_target
+        if cached is None or not (cached[0] is dst_img and cached[1] is dst_points and cached[2] == size):
+            mat = self.canonical_transform(dst_points, size)
+            dst_c = cv2.warpAffine(dst_img, mat, (size, size), flags=cv2.INTER_AREA, borderMode=cv2.BORDER_REFLECT_101)
+            dst_pts_c = cv2.transform(np.asarray(dst_points, np.float32).reshape(-1, 1, 2), mat).reshape(-1, 2)
+            self._canonical_target = (dst_img, dst_points, size, dst_c, dst_pts_c)
+            logger.info(f"_get_canonical_target: aligned target {dst_img.shape[1]}x{dst_img.shape[0]} to {size}x{size}")
+        return self._canonical_target[3], self._canonical_target[4]
+
+
+    def _morph_canonical(self, src_img, dst_img, src_points, dst_points, alpha):
+        size = int(self.canonical_size)
+        h, w = src_img.shape[:2]
+
+        mat = self.canonical_transform(src_points, size)
+        src_c = cv2.warpAffine(src_img, mat, (size, size), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT_101)
+        src_pts_c = cv2.transform(np.asarray(src_points, np.float32).reshape(-1, 1, 2), mat).reshape(-1, 2)
+        dst_c, dst_pts_c = self._get_canonical_target(dst_img, dst_points, size)
+
+        morphed_c = self._morph_frame(src_c, dst_c, src_pts_c, dst_pts_c, alpha)
+
+        # frame ROI covered by the canonical square
+        inv = cv2.invertAffineTransform(mat)
+        corners = np.array([[0, 0], [size, 0], [0, size], [size, size]], np.float32).reshape(-1, 1, 2)
+        corners = cv2.transform(corners, inv).reshape(-1, 2)
+        x0, y0 = np.maximum(np.floor(corners.min(axis=0)), 0).astype(int)
+        x1, y1 = np.minimum(np.ceil(corners.max(axis=0)), [w, h]).astype(int)
+        if x1 <= x0 or y1 <= y0:
+            return src_img.astype(np.uint8)
+
+        # a single affine remap of the morphed square back into the ROI
+        inv[:, 2] -= (x0, y0)
+        back = cv2.warpAffine(morphed_c, inv, (x1 - x0, y1 - y0), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT_101)
+
+        # only the morphed face hull replaces frame pixels; the rest stays untouched
+        interp_c = (1 - alpha) * src_pts_c + alpha * dst_pts_c
+        hull = cv2.convexHull(cv2.transform(interp_c.reshape(-1, 1, 2), inv).reshape(-1, 2))
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillConvexPoly(mask, np.int32(np.round(hull)), 255)
+
+        morphed_img = src_img.astype(np.uint8)
+        roi = morphed_img[y0:y1, x0:x1]
+        np.copyto(roi, back, where=(mask > 0)[..., None] if roi.ndim == 3 else mask > 0)
+        return morphed_img
+
+
+    def _morph_frame(self, src_img, dst_img, src_points, dst_points, alpha, texture=None):
+        """Morph in frame coordinates. `texture` is an optional (img, points) pair sampled for the
+        target side instead of dst_img / dst_points, e.g. a pyramid level of the target."""
+        tex_img, tex_points = texture if texture is not None else (dst_img, dst_points)
         morphed_img = src_img.astype(np.uint8)
         # morphed_img = np.zeros_like(dst_img, dtype=np.uint8)
 
         alpha = np.clip(alpha, 0.0, 1.0)
         logger.info(f"get_morphed_face: alpha={alpha} src_points={len(src_points)} dst_points={len(dst_points)}")
 
-        interpolated_points = []
-        for i in range(len(src_points)):
-            x = (1 - alpha) * src_points[i][0] + alpha * dst_points[i][0]
-            y = (1 - alpha) * src_points[i][1] + alpha * dst_points[i][1]
-            interpolated_points.append((x, y))
-
-        interpolated_points = np.array(interpolated_points, dtype=np.float32)
+        interpolated_points = ((1 - alpha) * np.asarray(src_points, np.float64)
+                               + alpha * np.asarray(dst_points, np.float64)).astype(np.float32)
         logger.debug(f"get_morphed_face: interpolated {len(interpolated_points)} points")
 
         h, w = morphed_img.shape[:2]
         # (x, y, w, h) is the expected rect ordering for Subdiv2D
         morphed_img_rect = (0, 0, w, h)
 
+        if self.incremental:
+            # cached patches are only valid for the same target, alpha and frame size
+            if tex_img is not self._cache_target:
+                self._cache_target = tex_img
+                self._target_token += 1
+            cache_key = (self._target_token, float(alpha), morphed_img.shape)
+            if cache_key != self._cache_key:
+                self.reset_cache()
+                self._cache_key = cache_key
+
         # build triangulation on the interpolated points
-        triangulater = self.triangulator(morphed_img_rect, interpolated_points)
-        triangles = triangulater.get_triangles(morphed_img_rect, interpolated_points)
+        triangles = self._get_triangles(morphed_img_rect, interpolated_points)
         logger.info(f"get_morphed_face: triangulation returned {len(triangles)} triangles")
         if len(triangles) == 0:
             logger.warning("get_morphed_face: no triangles found; morph will be empty")
-            # save debug images so the developer can inspect landmark positions
-            try:
-                import os
-                debug_dir = os.path.join(os.getcwd(), "morph_debug")
-                os.makedirs(debug_dir, exist_ok=True)
-
-                # draw landmarks on copies
-                try:
-                    src_vis = src_img.copy()
-                    dst_vis = dst_img.copy()
-                    for (x, y) in src_points:
-                        cv2.circle(src_vis, (int(x), int(y)), 1, (0, 255, 0), -1)
-                    for (x, y) in dst_points:
-                        cv2.circle(dst_vis, (int(x), int(y)), 1, (0, 255, 0), -1)
-
-                    interp_vis = morphed_img.copy()
-                    for (x, y) in interpolated_points:
-                        cv2.circle(interp_vis, (int(x), int(y)), 1, (0, 255, 0), -1)
-
-                    cv2.imwrite(os.path.join(debug_dir, "debug_src_landmarks.png"), src_vis)
-                    cv2.imwrite(os.path.join(debug_dir, "debug_dst_landmarks.png"), dst_vis)
-                    cv2.imwrite(os.path.join(debug_dir, "debug_interpolated.png"), interp_vis)
-                    logger.info(f"Wrote debug landmark images to {debug_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed writing debug images: {e}")
-
-            except Exception:
-                pass
+            # snapshot landmarks for inspection; written on a background thread
+            self.diagnostics.report_failure("no triangles", src_img, dst_img, src_points, dst_points,
+                                            interpolated_points)
 
             # Fallback: a coarse whole-face blend so user still sees something morphed
             try:
@@ -127,14 +409,45 @@ class FaceMorpher:
                 logger.error(f"Fallback blend failed: {e}")
                 return morphed_img
 
-        for tri_indices in triangles:
-            x, y, z = tri_indices
-
-            t1 = [src_points[x], src_points[y], src_points[z]]
-            t2 = [dst_points[x], dst_points[y], dst_points[z]]
-            t = [interpolated_points[x], interpolated_points[y], interpolated_points[z]]
-
-            self.morph_triangle(src_img, dst_img, morphed_img, t1, t2, t, alpha)
+        # all rects / offsets / affine matrices at once; the loop below only touches pixels
+        geometry = self.get_geometry(triangles, src_points, tex_points, interpolated_points)
+
+        hull_mode = self.composite == "hull"
+        if hull_mode:
+            # one label map instead of a mask per triangle: pixel p belongs to triangle labels[p] - 1
+            roi = self._face_roi(geometry, morphed_img.shape, pad=int(np.ceil(3 * self.feather)))
+            x0, y0, x1, y1 = roi
+            buf = morphed_img[y0:y1, x0:x1].copy()
+            labels = np.zeros((y1 - y0, x1 - x0), dtype=np.int32)
+            corners = (geometry.interp_rects[:, None, :2] - [x0, y0]).astype(np.int32)
+            for i in range(len(geometry)):
+                cv2.fillConvexPoly(labels, np.int32(geometry.interp_offsets[i]) + corners[i], i + 1)
+
+        hits, misses = self.cache_hits, self.cache_misses
+        for i, tri_indices in enumerate(triangles):
+            if self.incremental:
+                blended_patch, mask1, r1 = self._morph_triangle_cached(src_img, tex_img, tri_indices, geometry, i,
+                                                                       alpha, morphed_img.dtype,
+                                                                       img_morph=None if hull_mode else morphed_img)
+                if not hull_mode:
+                    continue
+            else:
+                blended_patch, mask1, r1 = self.blend_geometry(src_img, tex_img, geometry, i, alpha, morphed_img.dtype,
+                                                               with_mask=not hull_mode)
+
+            if hull_mode:
+                self._place_patch(buf, labels, (x0, y0), blended_patch, r1, i + 1)
+            else:
+                self.composite_patch(morphed_img, blended_patch, mask1, r1)
+
+        if hull_mode:
+            self._composite_hull(morphed_img, buf, roi, interpolated_points)
+
+        if self.incremental:
+            frame_hits = self.cache_hits - hits
+            frame_total = frame_hits + self.cache_misses - misses
+            logger.debug(f"get_morphed_face: incremental reuse {frame_hits}/{frame_total} triangles, "
+                         f"overall hit ratio={self.get_cache_stats()['hit_ratio']:.2f}")
 
         return morphed_img
     
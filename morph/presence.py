@@ -0,0 +1,114 @@
+import time
+import logging
+
+import cv2
+
+logger = logging.getLogger('presence')
+
+
+class PresenceGate():
+    """Skip landmarking and morphing on frames where nobody is in front of the camera.
+
+    While a face is present every frame goes through. After `absent_after`
+    consecutive frames without landmarks the gate closes; from then on only a
+    low-resolution face detector runs, on every `check_every`-th frame or at
+    once when a tiny thumbnail of the frame changes by more than
+    `motion_threshold` (mean abs grey level), so someone stepping in re-opens
+    the gate on the same frame.
+
+        if gate.should_process(frame):
+            points = faceutils.get_landmarks(frame)
+            gate.update(len(points) > 0)
+    """
+
+    def __init__(self, check_every=5, detect_width=160, min_confidence=0.5, absent_after=3, motion_threshold=8.0):
+        self.check_every = check_every
+        self.detect_width = detect_width
+        self.min_confidence = min_confidence
+        self.absent_after = absent_after
+        self.motion_threshold = motion_threshold
+        self._detector = None
+        self.reset()
+
+        self.frames = 0
+        self.skipped = 0
+        self.detector_runs = 0
+        self.detector_time = 0.0
+        self.reopened = 0
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            # imported here so modules that only reference PresenceGate don't load mediapipe
+            import mediapipe as mp
+            self._detector = mp.solutions.face_detection.FaceDetection(
+                model_selection=0, min_detection_confidence=self.min_confidence)
+        return self._detector
+
+    def reset(self):
+        """Open the gate, e.g. at the start of a stream."""
+        self.present = True
+        self._misses = 0
+        self._since_check = 0
+        self._last_thumb = None
+
+    def detect(self, frame):
+        """Run the low-resolution face detector on frame; returns True if a face was found."""
+        t0 = time.perf_counter()
+        h, w = frame.shape[:2]
+        if w > self.detect_width:
+            small = cv2.resize(frame, (self.detect_width, max(1, h * self.detect_width // w)),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+        results = self.detector.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        self.detector_runs += 1
+        self.detector_time += time.perf_counter() - t0
+        return bool(results.detections)
+
+    def _moved(self, frame):
+        thumb = cv2.cvtColor(cv2.resize(frame, (32, 24), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        last, self._last_thumb = self._last_thumb, thumb
+        return last is not None and cv2.norm(thumb, last, cv2.NORM_L1) / thumb.size > self.motion_threshold
+
+    def should_process(self, frame):
+        """True if frame should go through landmarking (and update() be called with the result)."""
+        self.frames += 1
+        if self.present:
+            return True
+
+        self._since_check += 1
+        if self._moved(frame) or self._since_check >= self.check_every:
+            self._since_check = 0
+            if self.detect(frame):
+                logger.info("PresenceGate: face detected, resuming landmarking")
+                self.present = True
+                self._misses = 0
+                self.reopened += 1
+                return True
+
+        self.skipped += 1
+        return False
+
+    def update(self, face_found):
+        """Report whether landmarking found a face on a frame that was let through."""
+        if face_found:
+            self._misses = 0
+            return
+        self._misses += 1
+        if self.present and self._misses >= self.absent_after:
+            logger.info("PresenceGate: no face, landmarking paused")
+            self.present = False
+            self._since_check = 0
+            self._last_thumb = None
+
+    def get_stats(self):
+        return {
+            "present": self.present,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0.0,
+            "detector_runs": self.detector_runs,
+            "detector_ms": 1000.0 * self.detector_time / self.detector_runs if self.detector_runs else 0.0,
+            "reopened": self.reopened,
+        }
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+import logging
+
+logger = logging.getLogger('pyramid')
+
+
+def face_extent(points):
+    """Size in pixels of the landmark bounding box (its larger side)."""
+    pts = np.asarray(points, dtype=np.float32)
+    if len(pts) == 0:
+        return 0.0
+    return float((pts.max(axis=0) - pts.min(axis=0)).max())
+
+
+class TargetPyramid():
+    """Pre-scaled copies of the target image with landmarks scaled per level.
+
+    Level 0 is the original image; each further level is a cv2.pyrDown of the
+    previous one, stopping once the face would be smaller than min_face_size.
+    """
+
+    def __init__(self, img, points, min_face_size=64):
+        self.base = img
+        self.base_points = points
+        self.levels = []
+
+        level_img = img
+        level_points = np.asarray(points, dtype=np.float32)
+        while True:
+            size = face_extent(level_points)
+            self.levels.append((level_img, level_points, size))
+            if size / 2.0 < min_face_size or min(level_img.shape[:2]) < 2:
+                break
+            h, w = level_img.shape[:2]
+            level_img = cv2.pyrDown(level_img)
+            nh, nw = level_img.shape[:2]
+            level_points = level_points * np.array([nw / w, nh / h], dtype=np.float32)
+
+        logger.info(f"TargetPyramid: built {len(self.levels)} levels, face sizes "
+                    f"{[int(lvl[2]) for lvl in self.levels]}")
+
+    def matches(self, img):
+        return img is self.base
+
+    def select(self, face_size):
+        """Return (level, img, points) whose face size is closest (in scale) to face_size."""
+        if face_size <= 0:
+            img, points, _ = self.levels[0]
+            return 0, img, points
+        best = min(range(len(self.levels)),
+                   key=lambda i: abs(np.log(max(self.levels[i][2], 1.0) / face_size)))
+        img, points, _ = self.levels[best]
+        return best, img, points
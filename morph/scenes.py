@@ -0,0 +1,70 @@
+import logging
+
+import cv2
+
+logger = logging.getLogger('scenes')
+
+
+class SceneCutDetector():
+    """Cheap hard-cut detection for edited footage.
+
+    Each frame is reduced to a small thumbnail; a cut is reported when both
+    the hue/saturation histogram distance (Bhattacharyya) to the previous
+    frame exceeds `hist_threshold` and the mean absolute grey-level
+    difference exceeds `pixel_threshold`. Requiring both keeps fast motion
+    (pixels change, colours don't) and flashes from counting as cuts.
+    After a cut the detector re-arms as soon as the histogram distance
+    between consecutive frames drops back below `hist_threshold`, so a
+    fast transition isn't reported once per frame while back-to-back
+    cuts (shots down to two frames) still are.
+    Shots are kept in `shots`, one dict per shot; callers may add their own
+    counters to the current shot (`shots[-1]`).
+    """
+
+    def __init__(self, hist_threshold=0.45, pixel_threshold=25.0, thumb_size=(64, 36)):
+        self.hist_threshold = hist_threshold
+        self.pixel_threshold = pixel_threshold
+        self.thumb_size = thumb_size
+        self.reset()
+
+    def reset(self):
+        self._prev_hist = None
+        self._prev_grey = None
+        self._armed = True
+        self.shots = []
+
+    def _start_shot(self, frame_index):
+        self.shots.append({"index": len(self.shots), "start": frame_index, "end": frame_index, "frames": 0})
+
+    def update(self, frame, frame_index):
+        """Feed the next frame; returns True if it starts a new shot (including the first frame)."""
+        thumb = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        grey = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+        cut = False
+        if self._prev_hist is None:
+            cut = True
+        else:
+            hist_dist = cv2.compareHist(self._prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+            if hist_dist <= self.hist_threshold:
+                self._armed = True
+            elif self._armed:
+                pixel_dist = cv2.norm(grey, self._prev_grey, cv2.NORM_L1) / grey.size
+                cut = pixel_dist > self.pixel_threshold
+                if cut:
+                    # one cut per transition: wait for the histogram to settle before the next
+                    self._armed = False
+                    logger.info(f"SceneCutDetector: cut at frame {frame_index} "
+                                f"(hist={hist_dist:.2f}, pixels={pixel_dist:.1f})")
+
+        self._prev_hist = hist
+        self._prev_grey = grey
+        if cut:
+            self._start_shot(frame_index)
+        shot = self.shots[-1]
+        shot["frames"] += 1
+        shot["end"] = frame_index
+        return cut
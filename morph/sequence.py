@@ -0,0 +1,103 @@
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from morph.morph_core import FaceMorpher
+
+logger = logging.getLogger('sequence')
+
+
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t,
+    "ease_out": lambda t: 1 - (1 - t) * (1 - t),
+    "ease_in_out": lambda t: t * t * (3 - 2 * t),
+}
+
+
+def alpha_curve(frames, easing="linear", start=0.0, end=1.0):
+    """`frames` alpha values from start to end (inclusive), shaped by an easing name or callable."""
+    if frames < 1:
+        raise ValueError("frames must be at least 1")
+    ease = EASINGS[easing] if isinstance(easing, str) else easing
+    t = np.linspace(0.0, 1.0, frames) if frames > 1 else np.zeros(1)
+    return [float(start + (end - start) * ease(x)) for x in t]
+
+
+class MorphSequence:
+    """Render many alphas of one source/target pair with shared work.
+
+    The triangulation is computed once (on the halfway landmarks), as is the
+    source/target half of the triangle geometry (rects, offsets), which
+    doesn't depend on alpha. Each frame only adds the interpolated half and
+    then warps, blends and composites. render() is thread-safe, so frames
+    can be rendered by a thread pool.
+    """
+
+    def __init__(self, src_img, dst_img, src_points, dst_points, morph_engine=None):
+        self.morph_engine = morph_engine or FaceMorpher()
+        self.src_img = src_img.astype(np.uint8)
+        self.dst_img = dst_img
+        src_points = np.asarray(src_points, dtype=np.float32)
+        dst_points = np.asarray(dst_points, dtype=np.float32)
+        if src_points.shape != dst_points.shape:
+            raise ValueError("source and target landmarks differ in count")
+
+        h, w = self.src_img.shape[:2]
+        mid_points = 0.5 * (src_points + dst_points)
+        self.triangles = self.morph_engine.get_triangles((0, 0, w, h), mid_points)
+        if len(self.triangles) == 0:
+            raise ValueError("triangulation returned no triangles")
+
+        self.geometry = self.morph_engine.get_geometry(self.triangles, src_points, dst_points)
+        logger.info(f"MorphSequence: {len(self.triangles)} triangles shared across frames")
+
+    def render(self, alpha):
+        """Return the morphed frame for one alpha."""
+        alpha = float(np.clip(alpha, 0.0, 1.0))
+        geometry = self.geometry.for_alpha(alpha)
+        morphed_img = self.src_img.copy()
+
+        for i in range(len(geometry)):
+            patch, mask, rect = self.morph_engine.blend_geometry(self.src_img, self.dst_img, geometry, i, alpha)
+            self.morph_engine.composite_patch(morphed_img, patch, mask, rect)
+
+        return morphed_img
+
+    def frames(self, alphas, workers=1):
+        """Yield (alpha, frame) in order; with workers > 1 frames render in parallel
+        and at most 2 * workers finished frames are held waiting for the consumer."""
+        alphas = list(alphas)
+        if workers <= 1:
+            for alpha in alphas:
+                yield alpha, self.render(alpha)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            it = iter(alphas)
+            for alpha in it:
+                pending.append((alpha, executor.submit(self.render, alpha)))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                alpha, future = pending.popleft()
+                yield alpha, future.result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt, executor.submit(self.render, nxt)))
+
+
+def render_sequence(src_img, dst_img, src_points, dst_points, alphas, sink, fps=30, workers=1, morph_engine=None):
+    """Open `sink`, render every alpha into it in order and close it; returns the number of frames written."""
+    sequence = MorphSequence(src_img, dst_img, src_points, dst_points, morph_engine)
+    h, w = sequence.src_img.shape[:2]
+    sink.open(w, h, fps)
+    try:
+        for _, frame in sequence.frames(alphas, workers):
+            sink.send(frame)
+    finally:
+        sink.close()
+    return sink.frames_sent
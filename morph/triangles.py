@@ -1,5 +1,4 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 import logging
 
@@ -1,20 +1,49 @@
 import cv2
 import numpy as np
-import mediapipe as mp
 import logging
+from morph.filters import OneEuroFilter
 
 logger = logging.getLogger('face_utils')
 
 class FaceUtils():
-    def __init__(self):
+    def __init__(self, landmark_filter=None, static_image_mode=True):
+        # landmark_filter: True for a default OneEuroFilter, or any callable(points, timestamp)
+        # with a reset() method. Filtered landmarks are returned as float32 (sub-pixel).
+        if landmark_filter is True:
+            landmark_filter = OneEuroFilter()
+        self.landmark_filter = landmark_filter
+
+        # static_image_mode=False tracks the face from frame to frame and only re-runs
+        # detection when tracking is lost; call reset_tracking() at scene cuts
+        self.static_image_mode = static_image_mode
+
+        # imported here so modules that only reference FaceUtils don't load mediapipe
+        import mediapipe as mp
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.facemesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
+        self.facemesh = self._build_facemesh()
+
+    def _build_facemesh(self):
+        return self.mp_face_mesh.FaceMesh(
+            static_image_mode=self.static_image_mode,
             max_num_faces=1,
             refine_landmarks=True,
-            min_detection_confidence=0.5
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
         )
 
+    def reset_tracking(self):
+        """Forget the tracked face (and smoothing state) so the next frame runs full detection."""
+        if self.landmark_filter is not None:
+            self.landmark_filter.reset()
+        if self.static_image_mode:
+            return
+        reset = getattr(self.facemesh, "reset", None)
+        if reset is not None:
+            reset()
+        else:
+            self.facemesh.close()
+            self.facemesh = self._build_facemesh()
+
     def read_image(self,path,size=(600,600)):
         img=cv2.imread(path)
 
@@ -24,23 +53,32 @@ class FaceUtils():
         logger.info(f"read_image: loaded {path} resized to {size}")
         return img
     
-    def get_landmarks(self, img):
+    def get_landmarks(self, img, timestamp=None, smooth=True):
         rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         results = self.facemesh.process(rgb)
 
         h,w,_ = img.shape
+        use_filter = smooth and self.landmark_filter is not None
         points = []
         if results.multi_face_landmarks:
-            for landmark in results.multi_face_landmarks[0].landmark:
-                x, y = int(landmark.x * w), int(landmark.y * h)
-                points.append((x, y))
+            if use_filter:
+                points = [(landmark.x * w, landmark.y * h) for landmark in results.multi_face_landmarks[0].landmark]
+            else:
+                for landmark in results.multi_face_landmarks[0].landmark:
+                    x, y = int(landmark.x * w), int(landmark.y * h)
+                    points.append((x, y))
         logger.debug(f"get_landmarks: found {len(points)} landmarks")
         if len(points) == 0:
             logger.warning("get_landmarks: no face landmarks detected")
-        
+            if use_filter:
+                # tracking lost: start fresh when the face comes back
+                self.landmark_filter.reset()
+
+        if use_filter and len(points) > 0:
+            return self.landmark_filter(np.array(points, np.float32), timestamp)
         return np.array(points, np.int32)
         
     def draw_landmarks(self, img, points, color=(0,200,0)):
         for (x, y) in points:
-            cv2.circle(img, (x, y), 1, color, -1)
+            cv2.circle(img, (int(x), int(y)), 1, color, -1)
         return img
\ No newline at end of file
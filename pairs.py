@@ -0,0 +1,225 @@
+"""Headless bulk morphing of static source/target image pairs.
+
+Sources and targets are given as directories or glob patterns. Every image's
+landmarks are detected once and kept in a persistent cache directory (keyed
+by path, size and mtime), so re-runs and images shared by many pairs never
+hit MediaPipe again. The pairs are then morphed on a process pool; a
+per-pair status report is written as JSON lines next to the outputs.
+
+    python pairs.py "catalogue/*.jpg" targets/ out/ --alpha 0.5 --workers 8
+    python pairs.py sources/ targets/ out/ --pairing name
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+logger = logging.getLogger('pairs')
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def expand_images(spec):
+    """Sorted image paths for a directory, a glob pattern or a single file."""
+    if os.path.isdir(spec):
+        paths = [os.path.join(spec, name) for name in os.listdir(spec)]
+    else:
+        paths = glob.glob(spec)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def make_pairs(sources, targets, pairing="product"):
+    """(source, target) pairs: every combination, or only files with the same stem."""
+    if pairing == "product":
+        return [(s, t) for s in sources for t in targets]
+    if pairing == "name":
+        by_stem = {os.path.splitext(os.path.basename(t))[0]: t for t in targets}
+        return [(s, by_stem[stem]) for s in sources
+                if (stem := os.path.splitext(os.path.basename(s))[0]) in by_stem]
+    raise ValueError(f"unknown pairing: {pairing}")
+
+
+def output_path(out_dir, source, target, pairing, ext=".png"):
+    s = os.path.splitext(os.path.basename(source))[0]
+    t = os.path.splitext(os.path.basename(target))[0]
+    return os.path.join(out_dir, (s if pairing == "name" else f"{s}__{t}") + ext)
+
+
+class LandmarkCache:
+    """Landmarks per image as .npy files in a directory; an empty array records "no face"."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, image_path):
+        st = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{st.st_size}|{st.st_mtime_ns}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npy")
+
+    def has(self, image_path):
+        return os.path.exists(self._path(image_path))
+
+    def get(self, image_path):
+        """Cached landmarks, None for "no face"; raises KeyError if never detected."""
+        path = self._path(image_path)
+        if not os.path.exists(path):
+            raise KeyError(image_path)
+        points = np.load(path)
+        return points if points.size else None
+
+    def put(self, image_path, points):
+        path = self._path(image_path)
+        tmp = path + ".tmp.npy"
+        found = points is not None and len(points) > 0
+        np.save(tmp, np.asarray(points) if found else np.empty((0, 2), np.int32))
+        os.replace(tmp, path)
+
+
+# ----------------- Worker processes -----------------
+_worker = {}
+
+
+def _init_detector(cache_dir):
+    # imported here so the parent process never loads MediaPipe
+    from morph.utils import FaceUtils
+
+    _worker["faceutils"] = FaceUtils()
+    _worker["cache"] = LandmarkCache(cache_dir)
+
+
+def _detect(image_path):
+    import cv2
+
+    img = cv2.imread(image_path)
+    if img is None:
+        return image_path, "unreadable"
+    points = _worker["faceutils"].get_landmarks(img, smooth=False)
+    _worker["cache"].put(image_path, points)
+    # get_landmarks returns an empty array when there is no face
+    return image_path, "ok" if len(points) > 0 else "no face"
+
+
+def _init_morpher(cache_dir):
+    from morph.morph_core import FaceMorpher
+
+    _worker["morph_engine"] = FaceMorpher()
+    _worker["cache"] = LandmarkCache(cache_dir)
+
+
+def _morph_pair(task):
+    import cv2
+
+    source, target, output, alpha = task
+    start = time.perf_counter()
+    result = {"source": source, "target": target, "output": output}
+    try:
+        cache = _worker["cache"]
+        src_points, dst_points = cache.get(source), cache.get(target)
+        if src_points is None or dst_points is None:
+            missing = "source" if src_points is None else "target"
+            return dict(result, status="skipped", error=f"no face in {missing}", elapsed=time.perf_counter() - start)
+
+        src_img = cv2.imread(source)
+        dst_img = cv2.imread(target)
+        if src_img is None or dst_img is None:
+            raise RuntimeError("could not load one or both images")
+
+        # match test_static_morph: the target is resized to the source; scale its landmarks instead of re-detecting
+        scale = np.array([src_img.shape[1] / dst_img.shape[1], src_img.shape[0] / dst_img.shape[0]])
+        dst_img = cv2.resize(dst_img, (src_img.shape[1], src_img.shape[0]))
+        dst_points = dst_points * scale
+
+        morphed = _worker["morph_engine"].get_morphed_face(src_img, dst_img, src_points, dst_points, alpha)
+        tmp = output + ".tmp" + os.path.splitext(output)[1]
+        if not cv2.imwrite(tmp, morphed):
+            raise RuntimeError(f"could not write {output}")
+        os.replace(tmp, output)
+        return dict(result, status="done", elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return dict(result, status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc(),
+                    elapsed=time.perf_counter() - start)
+
+
+# ----------------- Driver -----------------
+def morph_pairs(source_spec, target_spec, out_dir, alpha=0.5, pairing="product", workers=2, cache_dir=None,
+                overwrite=False, report_path=None):
+    """Morph all pairs; returns the list of per-pair results (also written to the report)."""
+    sources = expand_images(source_spec)
+    targets = expand_images(target_spec)
+    pairs = make_pairs(sources, targets, pairing)
+    logger.info(f"morph_pairs: {len(sources)} sources, {len(targets)} targets, {len(pairs)} pairs")
+
+    os.makedirs(out_dir, exist_ok=True)
+    cache_dir = cache_dir or os.path.join(out_dir, ".landmarks")
+    report_path = report_path or os.path.join(out_dir, "report.jsonl")
+    cache = LandmarkCache(cache_dir)
+    ctx = multiprocessing.get_context("spawn")
+
+    tasks = []
+    for source, target in pairs:
+        output = output_path(out_dir, source, target, pairing)
+        if overwrite or not os.path.exists(output):
+            tasks.append((source, target, output, alpha))
+
+    images = sorted({p for task in tasks for p in task[:2]})
+    to_detect = [p for p in images if not cache.has(p)]
+    logger.info(f"morph_pairs: {len(tasks)} pairs to morph, landmarks cached for "
+                f"{len(images) - len(to_detect)}/{len(images)} images")
+    if to_detect:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_detector, initargs=(cache_dir,)) as executor:
+            for path, status in executor.map(_detect, to_detect, chunksize=8):
+                if status != "ok":
+                    logger.warning(f"landmarks {path}: {status}")
+
+    results = []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_morpher, initargs=(cache_dir,)) as executor, \
+                open(report_path, "a") as report:
+            for i, result in enumerate(executor.map(_morph_pair, tasks, chunksize=4), 1):
+                results.append(result)
+                report.write(json.dumps({k: v for k, v in result.items() if k != "traceback"}) + "\n")
+                if result["status"] == "failed":
+                    logger.error(f"{result['source']} + {result['target']}: {result['error']}")
+                if i % 100 == 0:
+                    logger.info(f"morph_pairs: {i}/{len(tasks)} pairs")
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    logger.info(f"morph_pairs: {counts or 'nothing to do'}, report in {report_path}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Morph many source/target image pairs without a GUI")
+    parser.add_argument("sources", help="source images: directory or glob pattern")
+    parser.add_argument("targets", help="target images: directory or glob pattern")
+    parser.add_argument("out_dir", help="directory for morphed images and report.jsonl")
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--pairing", choices=("product", "name"), default="product",
+                        help="every source with every target, or only files with the same name")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--cache-dir", default=None, help="landmark cache (default: <out_dir>/.landmarks)")
+    parser.add_argument("--overwrite", action="store_true", help="re-morph pairs whose output already exists")
+    args = parser.parse_args()
+
+    results = morph_pairs(args.sources, args.targets, args.out_dir, args.alpha, args.pairing, args.workers,
+                          args.cache_dir, args.overwrite)
+    raise SystemExit(1 if any(r["status"] == "failed" for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
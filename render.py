@@ -0,0 +1,195 @@
+"""Checkpointed, resumable video rendering.
+
+The requested frame range is rendered as fixed-length segments into a work
+directory. A checkpoint file records every completed segment, so an
+interrupted render resumes from the first missing one. At the end the
+segments are joined with ffmpeg's concat demuxer without re-encoding.
+
+    python render.py source.jpeg input.mp4 output.mp4 --segment-frames 900
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+
+import cv2
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+logger = logging.getLogger('render')
+
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path, checkpoint):
+    # write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+
+def concat_segments(segment_paths, output_path, ffmpeg="ffmpeg"):
+    """Join segments with the same codec parameters into output_path without re-encoding."""
+    if shutil.which(ffmpeg) is None:
+        raise RuntimeError(f"{ffmpeg} not found; segments are kept, install ffmpeg and re-run to concatenate")
+
+    list_path = output_path + ".concat.txt"
+    with open(list_path, "w") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path],
+            check=True,
+        )
+    finally:
+        os.remove(list_path)
+
+
+def render_video(source_path, video_path, output_path, alpha=0.5, segment_frames=900, start_frame=0, end_frame=None,
+                 work_dir=None, keep_segments=False, progress_callback=None, landmark_mode="static"):
+    """Render frames [start_frame, end_frame) of video_path in checkpointed segments.
+
+    end_frame=None renders to the end of the stream; the container's frame
+    count is not trusted, a short or empty segment marks the end instead.
+
+    Re-running with the same arguments resumes after the last completed
+    segment. Raises ValueError if the work directory holds a checkpoint for
+    different render settings. landmark_mode is passed on to morph_video;
+    each segment starts with fresh tracking.
+    """
+    import trial
+    from morph.utils import FaceUtils
+    from morph.morph_core import FaceMorpher
+
+    if segment_frames <= 0:
+        raise ValueError("segment_frames must be positive")
+    if end_frame is not None and end_frame <= start_frame:
+        raise ValueError(f"empty frame range [{start_frame}, {end_frame})")
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("Could not open video file")
+    # the container's count is only a hint (for progress); segments run until the stream ends
+    frames_hint = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    work_dir = work_dir or output_path + ".segments"
+    os.makedirs(work_dir, exist_ok=True)
+    checkpoint_path = os.path.join(work_dir, "checkpoint.json")
+
+    settings = {
+        "source": os.path.abspath(source_path),
+        "video": os.path.abspath(video_path),
+        "alpha": alpha,
+        "start_frame": start_frame,
+        "end_frame": end_frame,
+        "segment_frames": segment_frames,
+    }
+    if landmark_mode != "static":
+        # only recorded when set, so checkpoints from before the option still resume
+        settings["landmark_mode"] = landmark_mode
+    checkpoint = _load_checkpoint(checkpoint_path)
+    if checkpoint is None:
+        checkpoint = {"settings": settings, "completed": {}}
+        _save_checkpoint(checkpoint_path, checkpoint)
+    elif checkpoint["settings"] != settings:
+        raise ValueError(f"{checkpoint_path} belongs to a render with different settings; "
+                         "remove the work directory to start over")
+
+    _, ext = os.path.splitext(output_path)
+    ext = ext or ".mp4"
+    total = (end_frame if end_frame is not None else max(frames_hint, 0)) - start_frame
+    logger.info(f"render_video: {len(checkpoint['completed'])} segments already done")
+
+    faceutils = morph_engine = profile = None
+    segment_paths = []
+    index = 0
+    while True:
+        seg_start = start_frame + index * segment_frames
+        if end_frame is not None and seg_start >= end_frame:
+            break
+        # "last_frame" is recorded once a segment came back short, i.e. the stream really ended there
+        if checkpoint.get("last_frame") is not None and seg_start > checkpoint["last_frame"]:
+            break
+        seg_end = seg_start + segment_frames if end_frame is None else min(seg_start + segment_frames, end_frame)
+        path = os.path.join(work_dir, f"segment_{index:05d}{ext}")
+
+        entry = checkpoint["completed"].get(str(index))
+        if entry is None or not os.path.exists(path):
+            if faceutils is None:
+                faceutils = FaceUtils(static_image_mode=landmark_mode == "static")
+                morph_engine = FaceMorpher()
+                profile = trial.load_source_profile(source_path, faceutils)
+
+            part = os.path.join(work_dir, f"segment_{index:05d}.part{ext}")
+
+            def report(frames_done, _total, seg_start=seg_start):
+                if progress_callback is not None:
+                    so_far = seg_start - start_frame + frames_done
+                    progress_callback(so_far, max(total, so_far))
+
+            summary = trial.morph_video(
+                source_path, video_path, part, alpha,
+                faceutils=faceutils, morph_engine=morph_engine, source_profile=profile,
+                preview=False, progress_callback=report, start_frame=seg_start, end_frame=seg_end,
+                landmark_mode=landmark_mode,
+            )
+            if summary["frames"] == 0:
+                if os.path.exists(part):
+                    os.remove(part)
+                if index == 0:
+                    raise RuntimeError(f"no frames read at {start_frame}")
+                # the previous segment ended exactly at the end of the stream
+                checkpoint["last_frame"] = seg_start - 1
+                _save_checkpoint(checkpoint_path, checkpoint)
+                break
+            os.replace(part, path)
+            entry = {"start": seg_start, "end": seg_start + summary["frames"], "frames": summary["frames"]}
+            checkpoint["completed"][str(index)] = entry
+            logger.info(f"render_video: segment {index} done (frames {entry['start']}-{entry['end'] - 1})")
+
+        segment_paths.append(path)
+        if entry["frames"] < seg_end - seg_start:
+            logger.info(f"render_video: stream ended at frame {entry['end'] - 1}")
+            checkpoint["last_frame"] = entry["end"] - 1
+        _save_checkpoint(checkpoint_path, checkpoint)
+        index += 1
+
+    concat_segments(segment_paths, output_path)
+    logger.info(f"render_video: wrote {output_path}")
+    if not keep_segments:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a morphed video in resumable segments")
+    parser.add_argument("source", help="source face image")
+    parser.add_argument("video", help="input video")
+    parser.add_argument("output", help="output video")
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--start", type=int, default=0, help="first frame to render")
+    parser.add_argument("--end", type=int, default=None, help="frame to stop before (default: end of video)")
+    parser.add_argument("--segment-frames", type=int, default=900)
+    parser.add_argument("--work-dir", default=None, help="segment/checkpoint directory (default: <output>.segments)")
+    parser.add_argument("--keep-segments", action="store_true")
+    parser.add_argument("--tracking", action="store_true",
+                        help="track landmarks within shots (reset at scene cuts) instead of detecting every frame")
+    args = parser.parse_args()
+
+    render_video(args.source, args.video, args.output, args.alpha, args.segment_frames, args.start, args.end,
+                 args.work_dir, args.keep_segments, landmark_mode="tracking" if args.tracking else "static")
+
+
+if __name__ == "__main__":
+    main()
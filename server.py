@@ -0,0 +1,427 @@
+"""Multi-stream morph server.
+
+Runs many live streams in one process. Streams share read-only target
+profiles (image, landmarks, pyramid) and a bounded pool of worker threads.
+
+Landmark models are not pooled: each stream keeps its own FaceMesh in
+tracking mode. Tracking state lives in the FaceMesh and a stream's frames
+land on whichever worker is free, so a per-worker model would have to run
+in static mode, i.e. full face detection on every frame. A tracking
+FaceMesh skips detection while the face stays in view, which saves more
+per frame than the extra memory per stream costs; CPU use stays bounded by
+the worker count, and each FaceMesh is only used by one worker at a time.
+A round-robin scheduler keeps at most one frame per stream in
+flight, so a busy stream cannot starve the others, and each stream always
+processes its newest captured frame.
+
+Control plane: a TCP socket taking one JSON command per line, e.g.
+
+    {"cmd": "add_stream", "id": "cam1", "target": "assets/faces/target.jpeg", "alpha": 0.5,
+     "source": {"type": "webcam", "index": 1},
+     "sinks": [{"type": "virtualcam", "device": "/dev/video11"}]}
+    sink types: virtualcam, file, shm (shared-memory preview, see
+    capture/shared_preview.py), null
+    {"cmd": "remove_stream", "id": "cam1"}
+    {"cmd": "stats"}
+    {"cmd": "profile", "duration": 10}   # sample all threads to morph_profiles/
+    {"cmd": "shutdown"}
+
+    python server.py --port 8765 --workers 4 [--config streams.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from capture.face_tracker import FaceTracker
+from capture.output_pacer import OutputPacer
+from capture.sources import WebcamSource, VideoFileSource, ImageSequenceSource
+from capture.shared_preview import SharedMemorySink
+from capture.sinks import VirtualCamSink, VideoFileSink, NullSink
+from misc.profiler import SamplingProfiler
+from morph.engine import StageTimings
+from morph.filters import OneEuroFilter
+from morph.morph_core import FaceMorpher
+from morph.pyramid import TargetPyramid
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+logger = logging.getLogger('server')
+
+
+def make_source(spec):
+    kind = spec.get("type", "webcam")
+    if kind == "webcam":
+        return WebcamSource(spec.get("index", 1))
+    if kind == "file":
+        return VideoFileSource(spec["path"], realtime=spec.get("realtime", True), loop=spec.get("loop", False))
+    if kind == "images":
+        return ImageSequenceSource(spec["pattern"], fps=spec.get("fps", 30.0), realtime=spec.get("realtime", True),
+                                   loop=spec.get("loop", False))
+    raise ValueError(f"unknown source type: {kind}")
+
+
+def make_sink(spec):
+    kind = spec.get("type", "virtualcam")
+    if kind == "virtualcam":
+        return VirtualCamSink(spec.get("device", "/dev/video10"))
+    if kind == "file":
+        return VideoFileSink(spec["path"], spec.get("fourcc", "mp4v"))
+    if kind == "preview":
+        # sinks are fed from pool threads and HighGUI windows only work from the main thread
+        raise ValueError("preview sinks are not supported by the server; use an \"shm\" sink "
+                         "and view it with capture.shared_preview.SharedMemoryPreview")
+    if kind == "shm":
+        return SharedMemorySink(spec["name"], max_width=spec.get("max_width", 480), every=spec.get("every", 2))
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f"unknown sink type: {kind}")
+
+
+class TargetProfile():
+    """Read-only target data shared by every stream morphing towards the same image."""
+
+    def __init__(self, path, faceutils):
+        self.path = path
+        self.img = cv2.imread(path)
+        if self.img is None:
+            raise ValueError(f"could not read target image: {path}")
+        self.points = faceutils.get_landmarks(self.img, smooth=False)
+        if len(self.points) == 0:
+            raise RuntimeError(f"no face detected in target image: {path}")
+        self.img.setflags(write=False)
+        self.pyramid = TargetPyramid(self.img, self.points)
+
+
+class Stream():
+    """One input source morphed into one or more sinks."""
+
+    def __init__(self, stream_id, tracker, sinks, profile, alpha, fps):
+        self.id = stream_id
+        self.tracker = tracker
+        self.sinks = sinks
+        self.profile = profile
+        self.alpha = alpha
+        self.fps = fps
+
+        # per-stream state: warp cache, landmark filter and a tracking FaceMesh (built on the
+        # first frame, on a pool thread)
+        self.morpher = FaceMorpher(incremental=True)
+        self.morpher.set_target(profile.img, profile.points, pyramid=profile.pyramid)
+        self.landmark_filter = OneEuroFilter()
+        self.faceutils = None
+
+        self.pacers = []
+        self.direct_sinks = []
+        self.busy = False
+        self.ended = False
+        self.last_seq = 0
+
+        self.processed = 0
+        self.morphed = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.total_process_time = 0.0
+        self.timings = StageTimings()
+        self.started = time.monotonic()
+
+    def open(self):
+        self.tracker.start_capture()
+        for sink in self.sinks:
+            sink.open(self.tracker.width, self.tracker.height, self.fps)
+            if sink.realtime:
+                pacer = OutputPacer(sink, self.fps)
+                pacer.start()
+                self.pacers.append(pacer)
+            else:
+                self.direct_sinks.append(sink)
+
+    def poll(self):
+        """Newest captured frame not yet processed, or None (never blocks)."""
+        frame, ts, seq = self.tracker.read(with_meta=True, timeout=0)
+        if frame is None:
+            if self.tracker.stopped:
+                self.ended = True
+            return None
+        if seq <= self.last_seq:
+            return None
+        self.last_seq = seq
+        return frame, ts
+
+    def process(self, frame, ts):
+        """Runs on a pool thread; only one call per stream is ever in flight."""
+        t0 = time.monotonic()
+        output = frame
+        try:
+            if self.faceutils is None:
+                from morph.utils import FaceUtils
+                self.faceutils = FaceUtils(landmark_filter=self.landmark_filter, static_image_mode=False)
+            points = self.faceutils.get_landmarks(frame, ts)
+            t1 = time.monotonic()
+            self.timings.add("landmarks", t1 - t0)
+            if len(points) == len(self.profile.points):
+                output = self.morpher.get_morphed_face(frame, self.profile.img, points, self.profile.points, self.alpha)
+                self.timings.add("morph", time.monotonic() - t1)
+                self.morphed += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"stream {self.id}: morph failed: {e}")
+
+        for pacer in self.pacers:
+            pacer.submit(output)
+        for sink in self.direct_sinks:
+            try:
+                sink.send(output)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"stream {self.id}: sink {type(sink).__name__} failed: {e}")
+
+        done = time.monotonic()
+        self.timings.add("process", done - t0)
+        self.processed += 1
+        self.total_process_time += done - t0
+        self.total_latency += done - ts
+
+    def close(self):
+        for pacer in self.pacers:
+            pacer.stop()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        self.tracker.release()
+        if self.faceutils is not None:
+            self.faceutils.facemesh.close()
+            self.faceutils = None
+
+    def get_stats(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        capture = self.tracker.get_capture_stats()
+        n = max(self.processed, 1)
+        return {
+            "target": self.profile.path,
+            "ended": self.ended,
+            "captured": capture["captured"],
+            "processed": self.processed,
+            "morphed": self.morphed,
+            # frames replaced in the capture slot before the scheduler got to them
+            "dropped": capture["dropped"],
+            "errors": self.errors,
+            "fps": self.processed / elapsed,
+            "avg_latency_ms": 1000.0 * self.total_latency / n,
+            "avg_process_ms": 1000.0 * self.total_process_time / n,
+            "output": [pacer.get_stats() for pacer in self.pacers],
+            "cache": self.morpher.get_cache_stats(),
+            "stages": self.timings.snapshot(),
+        }
+
+
+class MorphServer():
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="morph-worker")
+        self.streams = {}
+        self.profiles = {}
+        self.inflight = 0
+        self._clients = set()
+        self._profile_lock = threading.Lock()
+        self._profile_faceutils = None
+        self._rr = 0
+        # on-demand profiles of all worker threads, via the "profile" command
+        self.profiler = SamplingProfiler(snapshot=self.get_stats)
+        self._wakeup = None
+        self._stopped = None
+
+    def get_profile(self, path):
+        path = os.path.abspath(path)
+        with self._profile_lock:
+            if path not in self.profiles:
+                if self._profile_faceutils is None:
+                    from morph.utils import FaceUtils
+                    self._profile_faceutils = FaceUtils()
+                self.profiles[path] = TargetProfile(path, self._profile_faceutils)
+            return self.profiles[path]
+
+    async def add_stream(self, spec):
+        stream_id = str(spec["id"])
+        if stream_id in self.streams:
+            raise ValueError(f"stream {stream_id} already exists")
+
+        def build():
+            profile = self.get_profile(spec["target"])
+            sinks = [make_sink(s) for s in spec.get("sinks", [{"type": "null"}])]
+            tracker = FaceTracker(source=make_source(spec.get("source", {})), threaded=True)
+            stream = Stream(stream_id, tracker, sinks, profile, float(spec.get("alpha", 0.5)), spec.get("fps", 30))
+            try:
+                stream.open()
+            except Exception:
+                # don't leave the capture thread holding the camera or half the sinks open
+                stream.close()
+                raise
+            return stream
+
+        # opening cameras / loading targets blocks; keep it off the event loop
+        stream = await asyncio.get_running_loop().run_in_executor(None, build)
+        self.streams[stream_id] = stream
+        logger.info(f"add_stream: {stream_id} started ({len(self.streams)} streams)")
+        self._wakeup.set()
+        return {"id": stream_id}
+
+    async def remove_stream(self, stream_id):
+        stream = self.streams.pop(str(stream_id), None)
+        if stream is None:
+            raise ValueError(f"no stream {stream_id}")
+        while stream.busy:
+            await asyncio.sleep(0.005)
+        await asyncio.get_running_loop().run_in_executor(None, stream.close)
+        logger.info(f"remove_stream: {stream_id} stopped")
+        return {"id": stream_id, "stats": stream.get_stats()}
+
+    def get_stats(self):
+        return {
+            "workers": self.workers,
+            "inflight": self.inflight,
+            "profiles": list(self.profiles),
+            "streams": {sid: s.get_stats() for sid, s in self.streams.items()},
+        }
+
+    async def schedule(self):
+        """Round-robin dispatch: at most one frame per stream and `workers` frames in flight overall."""
+        loop = asyncio.get_running_loop()
+        while not self._stopped.is_set():
+            streams = list(self.streams.values())
+            dispatched = False
+            for i in range(len(streams)):
+                if self.inflight >= self.workers:
+                    break
+                stream = streams[(self._rr + i) % len(streams)]
+                if stream.busy or stream.ended:
+                    continue
+                polled = stream.poll()
+                if polled is None:
+                    continue
+                stream.busy = True
+                self.inflight += 1
+                dispatched = True
+                future = loop.run_in_executor(self.pool, self._run, stream, *polled)
+                future.add_done_callback(lambda f, s=stream: self._done(s, f))
+            if streams:
+                self._rr = (self._rr + 1) % len(streams)
+
+            for stream in [s for s in streams if s.ended and not s.busy and s.id in self.streams]:
+                logger.info(f"schedule: stream {stream.id} source ended")
+                await self.remove_stream(stream.id)
+
+            if not dispatched:
+                # nothing ready: wait for a finished job or a new stream; capture threads don't
+                # signal the loop, so new frames are picked up by polling again after 5 ms
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=0.005)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _run(self, stream, frame, ts):
+        stream.process(frame, ts)
+
+    def _done(self, stream, future):
+        stream.busy = False
+        self.inflight -= 1
+        if future.exception() is not None:
+            logger.error(f"stream {stream.id}: worker error {future.exception()}")
+        self._wakeup.set()
+
+    async def handle_client(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            await self._handle_commands(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def _handle_commands(self, reader, writer):
+        while not reader.at_eof():
+            line = await reader.readline()
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                cmd = request.get("cmd")
+                if cmd == "add_stream":
+                    result = await self.add_stream(request)
+                elif cmd == "remove_stream":
+                    result = await self.remove_stream(request["id"])
+                elif cmd == "stats":
+                    result = self.get_stats()
+                elif cmd == "profile":
+                    started = self.profiler.trigger(request.get("duration"))
+                    result = {"started": started, "out_dir": self.profiler.out_dir,
+                              "last_output": self.profiler.last_output}
+                elif cmd == "list":
+                    result = list(self.streams)
+                elif cmd == "shutdown":
+                    self._stopped.set()
+                    result = "shutting down"
+                else:
+                    raise ValueError(f"unknown command: {cmd}")
+                response = {"ok": True, "result": result}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            writer.write((json.dumps(response, default=str) + "\n").encode())
+            await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765, initial_streams=()):
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        logger.info(f"serve: control plane on {host}:{port}, {self.workers} morph workers")
+        for spec in initial_streams:
+            await self.add_stream(spec)
+
+        scheduler = asyncio.create_task(self.schedule())
+        try:
+            await self._stopped.wait()
+        finally:
+            server.close()
+            # wait_closed() waits for connected clients, so hang up on them first
+            for writer in list(self._clients):
+                writer.close()
+            await server.wait_closed()
+            await scheduler
+            for stream_id in list(self.streams):
+                await self.remove_stream(stream_id)
+            self.pool.shutdown(wait=True)
+            logger.info("serve: stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many live morph streams from one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--config", default=None, help="JSON file with a list of add_stream specs to start with")
+    args = parser.parse_args()
+
+    initial = []
+    if args.config:
+        with open(args.config) as f:
+            initial = json.load(f)
+
+    server = MorphServer(args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port, initial))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
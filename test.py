@@ -2,7 +2,6 @@ import cv2
 import numpy as np
 from morph.morph_core import FaceMorpher
 from morph.utils import FaceUtils
-import pyvirtualcam as pvc
 
 
 def test_static_morph(source_path, target_path):
@@ -42,6 +41,8 @@ def test_static_morph(source_path, target_path):
 
 
 def test_cam_morph(cam_index=0, virt_cam_device="/dev/video10", fps=30):
+    import pyvirtualcam as pvc
+
     # Initialize components
     utils = FaceUtils()
     morpher = FaceMorpher()
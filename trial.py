@@ -1,15 +1,25 @@
 from capture.face_tracker import FaceTracker
 from morph.utils import FaceUtils
 from morph.morph_core import FaceMorpher
+from morph.presence import PresenceGate
+from morph.scenes import SceneCutDetector
+from capture.output_pacer import OutputPacer
 import cv2
 import os
-import pyvirtualcam
 import numpy as np
 import threading
 import time
 
 
-faceutils = FaceUtils()
+# FaceMesh is built on first use (not at import)
+_faceutils = None
+
+
+def get_faceutils():
+    global _faceutils
+    if _faceutils is None:
+        _faceutils = FaceUtils()
+    return _faceutils
 
 
 def init_components(source_path):
@@ -21,7 +31,7 @@ def init_components(source_path):
         raise ValueError("Error reading Image")
     target_img = cv2.cvtColor(target_img, cv2.COLOR_BGR2RGB)
 
-    target_points = faceutils.get_landmarks(target_img)
+    target_points = get_faceutils().get_landmarks(target_img)
     if target_points is None or len(target_points) == 0:
         raise RuntimeError("Face Not Detected")
 
@@ -39,7 +49,7 @@ def init_components(source_path):
 def morph_live_frame(frame, target_img, target_points, morph_engine, alpha):
     try:
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        src_points = faceutils.get_landmarks(frame_rgb)
+        src_points = get_faceutils().get_landmarks(frame_rgb)
         if src_points is None or len(src_points) == 0:
             return frame
         if len(src_points) != len(target_points):
@@ -100,6 +110,8 @@ def run_live_morph(tracker, target_img, target_points, morph_engine, virt_cam_de
         raise RuntimeError("Could not read initial frame")
     height, width = frame.shape[:2]
 
+    import pyvirtualcam
+
     alpha = 0.5
     worker = MorphWorker(target_img, target_points, morph_engine, alpha)
     worker.start()
@@ -107,26 +119,32 @@ def run_live_morph(tracker, target_img, target_points, morph_engine, virt_cam_de
     try:
         with pyvirtualcam.Camera(width=width, height=height, fps=fps, device=virt_cam_device) as cam:
             print("Virtual cam started")
+            pacer = OutputPacer(cam, fps)
+            pacer.start()
 
-            while True:
-                frame = tracker.read()
-                if frame is None:
-                    continue
+            try:
+                while True:
+                    frame = tracker.read()
+                    if frame is None:
+                        continue
 
-                # Submit frame to worker
-                worker.submit(frame)
+                    # Submit frame to worker
+                    worker.submit(frame)
 
-                # Get latest processed result
-                result = worker.get_latest()
-                if result is None:
-                    result = frame
+                    # Get latest processed result
+                    result = worker.get_latest()
+                    if result is None:
+                        result = frame
 
-                cam.send(result)
-                cam.sleep_until_next_frame()
+                    # paced output on its own thread; never blocks this loop
+                    pacer.submit(result)
 
-                cv2.imshow("FaceMorph Live", result)
-                if cv2.waitKey(1) & 0xFF == 27:  # ESC to exit
-                    break
+                    cv2.imshow("FaceMorph Live", result)
+                    if cv2.waitKey(1) & 0xFF == 27:  # ESC to exit
+                        break
+            finally:
+                pacer.stop()
+                print(f"Output stats: {pacer.get_stats()}")
 
     except Exception as e:
         print(f"Virtual cam failed: {e}")
@@ -136,23 +154,75 @@ def run_live_morph(tracker, target_img, target_points, morph_engine, virt_cam_de
         cv2.destroyAllWindows()
 
 
-# ----------------- Entry Point -----------------
-def morph_video(source_path="assets/faces/source.jpeg", video_path="input_video.mp4", output_path="morphed_output.mp4", alpha=0.5):
-    # Initialize components
-    faceutils = FaceUtils()
-    morph_engine = FaceMorpher()
+# ----------------- Video Morphing -----------------
+def seek_to_frame(cap, frame_index):
+    """Position cap so the next read() returns frame_index; falls back to grabbing if seeking is inexact."""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if pos == frame_index:
+        return
+    if pos > frame_index or pos < 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        pos = 0
+    while pos < frame_index and cap.grab():
+        pos += 1
+
 
-    # Load source image
+def load_source_profile(source_path, faceutils):
+    """Load the source image and its landmarks; raises if the file or face is missing."""
     if not os.path.exists(source_path):
         raise FileNotFoundError("Source image not found")
     source_img = cv2.imread(source_path)
     if source_img is None:
         raise ValueError("Error reading source image")
-    
-    # Get source landmarks
+
     source_points = faceutils.get_landmarks(source_img)
     if source_points is None or len(source_points) == 0:
         raise RuntimeError("Face not detected in source image")
+    return source_img, source_points
+
+
+def morph_video(source_path="assets/faces/source.jpeg", video_path="input_video.mp4", output_path="morphed_output.mp4", alpha=0.5,
+                faceutils=None, morph_engine=None, source_profile=None, preview=True, progress_callback=None,
+                start_frame=0, end_frame=None, presence_gate=None, preview_shm=None, landmark_mode="static"):
+    """Morph frames [start_frame, end_frame) of video_path towards the source face and write output_path.
+
+    faceutils / morph_engine / source_profile ((img, points) from
+    load_source_profile) can be passed in to reuse warm objects across calls.
+    progress_callback(frames_done, total_frames) is called every 30 frames;
+    total_frames is the size of the requested range (0 if unknown).
+    presence_gate (a PresenceGate, or True for a default one) skips
+    landmarking on stretches of the video without a face.
+    preview_shm names a shared-memory ring (see capture.shared_preview) to
+    publish a decimated preview into, e.g. for the Tk control panel.
+    landmark_mode="tracking" tracks the face within each shot instead of
+    detecting it on every frame; scene cuts reset the tracker, and per-shot
+    stats are returned under "shots".
+    Returns a summary dict.
+    """
+    if landmark_mode not in ("static", "tracking"):
+        raise ValueError(f"unknown landmark_mode: {landmark_mode}")
+    tracking = landmark_mode == "tracking"
+
+    # Initialize components
+    faceutils = faceutils or FaceUtils(static_image_mode=not tracking)
+    morph_engine = morph_engine or FaceMorpher()
+    if presence_gate is True:
+        presence_gate = PresenceGate()
+
+    # Load source image and landmarks
+    if source_profile is None:
+        source_profile = load_source_profile(source_path, faceutils)
+    source_img, source_points = source_profile
+    morph_engine.set_target(source_img, source_points)
+
+    # tracking needs a video-mode FaceMesh; a shared static one is only used for the source profile
+    video_faceutils = faceutils
+    scene_detector = None
+    if tracking:
+        if faceutils.static_image_mode:
+            video_faceutils = FaceUtils(static_image_mode=False)
+        scene_detector = SceneCutDetector()
 
     # Open video
     cap = cv2.VideoCapture(video_path)
@@ -163,15 +233,29 @@ def morph_video(source_path="assets/faces/source.jpeg", video_path="input_video.
     fps = int(cap.get(cv2.CAP_PROP_FPS))
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if end_frame is None and video_frames > 0:
+        end_frame = video_frames
+    total_frames = max(end_frame - start_frame, 0) if end_frame is not None else 0
+
+    if start_frame > 0:
+        seek_to_frame(cap, start_frame)
 
     # Create video writer
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
+    preview_sink = None
+    if preview_shm is not None:
+        from capture.shared_preview import SharedMemorySink
+        preview_sink = SharedMemorySink(preview_shm)
+        preview_sink.open(width, height, fps)
+
+    frame_count = 0
+    morphed_count = 0
+    cancelled = False
     try:
-        frame_count = 0
-        while True:
+        while end_frame is None or frame_count < end_frame - start_frame:
             ret, frame = cap.read()
             if not ret:
                 break
@@ -179,37 +263,82 @@ def morph_video(source_path="assets/faces/source.jpeg", video_path="input_video.
             # Update progress
             frame_count += 1
             if frame_count % 30 == 0:  # Show progress every 30 frames
-                progress = (frame_count / total_frames) * 100
-                print(f"Processing: {progress:.1f}% complete")
-
+                if progress_callback is not None:
+                    progress_callback(frame_count, total_frames)
+                elif total_frames > 0:
+                    progress = (frame_count / total_frames) * 100
+                    print(f"Processing: {progress:.1f}% complete")
+
+            result = frame
+            shot = None
+            if scene_detector is not None:
+                # never carry a tracked face (or smoothing) across a cut
+                if scene_detector.update(frame, start_frame + frame_count - 1):
+                    video_faceutils.reset_tracking()
+                    morph_engine.reset_cache()
+                    if presence_gate is not None:
+                        presence_gate.reset()
+                shot = scene_detector.shots[-1]
             try:
                 # Get landmarks for current frame
-                frame_points = faceutils.get_landmarks(frame)
+                if presence_gate is not None and not presence_gate.should_process(frame):
+                    frame_points = None
+                else:
+                    t0 = time.perf_counter()
+                    frame_points = video_faceutils.get_landmarks(frame)
+                    if shot is not None:
+                        shot["landmark_time"] = shot.get("landmark_time", 0.0) + time.perf_counter() - t0
+                        shot["faces"] = shot.get("faces", 0) + (len(frame_points) > 0)
+                    if presence_gate is not None:
+                        presence_gate.update(len(frame_points) > 0)
                 
                 if frame_points is not None and len(frame_points) == len(source_points):
                     # Perform morphing
-                    morphed = morph_engine.get_morphed_face(frame, source_img, frame_points, source_points, alpha)
-                    out.write(morphed)
-                else:
-                    # If no face detected, write original frame
-                    out.write(frame)
-                
-                # Display preview (optional)
-                cv2.imshow('Morphing Preview', morphed if 'morphed' in locals() else frame)
-                if cv2.waitKey(1) & 0xFF == 27:  # ESC to cancel
-                    print("\nProcessing cancelled by user")
-                    break
+                    result = morph_engine.get_morphed_face(frame, source_img, frame_points, source_points, alpha)
+                    morphed_count += 1
+                    if shot is not None:
+                        shot["morphed"] = shot.get("morphed", 0) + 1
+                # If no face detected, the original frame is written
+                out.write(result)
 
             except Exception as e:
                 print(f"Error processing frame {frame_count}: {e}")
                 out.write(frame)  # Write original frame on error
 
+            if preview_sink is not None:
+                preview_sink.send(result)
+
+            if preview:
+                # Display preview (optional)
+                cv2.imshow('Morphing Preview', result)
+                if cv2.waitKey(1) & 0xFF == 27:  # ESC to cancel
+                    print("\nProcessing cancelled by user")
+                    cancelled = True
+                    break
+
     finally:
         cap.release()
         out.release()
-        cv2.destroyAllWindows()
+        if preview_sink is not None:
+            preview_sink.close()
+        if preview:
+            cv2.destroyAllWindows()
         print(f"\nProcessing complete. Output saved to {output_path}")
 
+    if progress_callback is not None:
+        progress_callback(frame_count, total_frames)
+    summary = {"frames": frame_count, "morphed_frames": morphed_count, "cancelled": cancelled, "output": output_path}
+    if presence_gate is not None:
+        summary["presence"] = presence_gate.get_stats()
+    if scene_detector is not None:
+        summary["shots"] = [
+            {"index": s["index"], "start": s["start"], "end": s["end"], "frames": s["frames"],
+             "faces": s.get("faces", 0), "morphed": s.get("morphed", 0),
+             "avg_landmark_ms": 1000.0 * s.get("landmark_time", 0.0) / max(s["frames"], 1)}
+            for s in scene_detector.shots
+        ]
+    return summary
+
 
 def main():
     try:
@@ -4,13 +4,25 @@ import os
 import subprocess
 import sys
 import shutil
+import signal
 from pathlib import Path
 
+from capture.shared_preview import SharedMemoryPreview
+
+PREVIEW_POLL_MS = 50
+
 class FaceMorphUI:
     def __init__(self, root):
         self.root = root
         self.root.title("FaceMorph Live")
-        self.root.geometry("600x400")
+        self.root.geometry("600x720")
+
+        # the running job publishes a decimated preview into shared memory;
+        # it is polled from the Tk event loop, never drawn by the job itself
+        self.process = None
+        self.preview = None
+        self.preview_image = None
+        self._jobs_started = 0
         
         # Create main frame
         main_frame = ttk.Frame(root, padding="10")
@@ -66,6 +78,16 @@ class FaceMorphUI:
                   command=self.run_static_morph).grid(row=0, column=1, padx=10)
         ttk.Button(buttons_frame, text="Video Morph", 
                   command=self.run_video_morph).grid(row=0, column=2, padx=10)
+        ttk.Button(buttons_frame, text="Stop",
+                  command=self.stop_job).grid(row=0, column=3, padx=10)
+
+        # Live preview
+        preview_frame = ttk.LabelFrame(main_frame, text="Preview", padding="10")
+        preview_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        self.preview_label = ttk.Label(preview_frame, text="No job running", anchor=tk.CENTER)
+        self.preview_label.grid(row=0, column=0)
+
+        self.root.after(PREVIEW_POLL_MS, self._poll_preview)
 
     def browse_file(self, path_var, filetypes):
         filename = filedialog.askopenfilename(
@@ -75,6 +97,49 @@ class FaceMorphUI:
         if filename:
             path_var.set(filename)
 
+    def _start_job(self, script):
+        # one job at a time: it owns the preview ring
+        self.stop_job()
+        self._jobs_started += 1
+        self.process = subprocess.Popen([sys.executable, script])
+        self.preview_label.configure(text="Starting...", image="")
+
+    def _new_preview_name(self):
+        if self.preview is not None:
+            self.preview.close()
+        name = f"facemorph_preview_{os.getpid()}_{self._jobs_started + 1}"
+        self.preview = SharedMemoryPreview(name)
+        return name
+
+    def stop_job(self):
+        if self.process is not None and self.process.poll() is None:
+            # SIGINT lets the job close its sinks (and the shared memory) on the way out
+            if hasattr(signal, "SIGINT") and os.name != "nt":
+                self.process.send_signal(signal.SIGINT)
+            else:
+                self.process.terminate()
+
+    def _poll_preview(self):
+        try:
+            if self.preview is not None and self.preview.attach():
+                frame = self.preview.read()
+                if frame is not None:
+                    h, w = frame.shape[:2]
+                    # binary PPM straight from the BGR buffer; Tk decodes it without PIL
+                    ppm = f"P6 {w} {h} 255 ".encode() + frame[..., ::-1].tobytes()
+                    self.preview_image = tk.PhotoImage(data=ppm, format="PPM")
+                    self.preview_label.configure(image=self.preview_image, text="")
+
+            if self.process is not None and self.process.poll() is not None:
+                self.process = None
+                if self.preview is not None:
+                    self.preview.close()
+                    self.preview = None
+                self.preview_image = None
+                self.preview_label.configure(image="", text="No job running")
+        finally:
+            self.root.after(PREVIEW_POLL_MS, self._poll_preview)
+
     def run_live_morph(self):
         try:
             if not self.source_path.get():
@@ -82,14 +147,15 @@ class FaceMorphUI:
                 return
                 
             # Create a temporary script to run main with the source path
+            preview_name = self._new_preview_name()
             with open("temp_live_script.py", "w") as f:
                 f.write(f"""
 import main
-main.main(source_path="{self.source_path.get()}")
+main.main(source_path="{self.source_path.get()}", preview_shm="{preview_name}")
 """)
             
             # Run the temporary script
-            subprocess.Popen([sys.executable, "temp_live_script.py"])
+            self._start_job("temp_live_script.py")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start live morphing: {str(e)}")
 
@@ -120,6 +186,7 @@ test.test_static_morph("{self.source_path.get()}", "{self.target_path.get()}")
                 return
             
             # Create a temporary script to run video morphing
+            preview_name = self._new_preview_name()
             with open("temp_morph_script.py", "w") as f:
                 f.write(f"""
 import trial
@@ -127,12 +194,14 @@ trial.morph_video(
     source_path="{self.source_path.get()}",
     video_path="{self.video_path.get()}",
     output_path="morphed_output.mp4",
-    alpha={self.alpha.get()}
+    alpha={self.alpha.get()},
+    preview=False,
+    preview_shm="{preview_name}"
 )
 """)
             
             # Run the temporary script
-            subprocess.Popen([sys.executable, "temp_morph_script.py"])
+            self._start_job("temp_morph_script.py")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start video morphing: {str(e)}")
 